@@ -0,0 +1,307 @@
+"""상담 일괄 실행 (CSV/JSONL → 결과 JSONL)
+
+사용법:
+    python batch_consult.py cases.csv --output results.jsonl
+    python batch_consult.py cases.jsonl --output results.jsonl --processes 4 --concurrency 8
+
+입력 레코드: id(선택), pet_name, pet_type, pet_age, pet_weight, symptoms
+(JSONL 은 pet_name 등 대신 pet_info 객체를 써도 된다). id 가 없으면 줄 번호를 사용한다.
+
+결과는 끝나는 대로 한 줄씩 기록하므로, 중단 후 같은 명령을 다시 실행하면
+이미 성공한 id 는 건너뛰고 나머지(실패 포함)만 이어서 처리한다. 같은 id 가 여러 번 있으면 마지막 줄이 유효하다.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from db import DB_PATH
+from metrics import percentile, start_exporters
+from model_backends import INFERENCE_BACKENDS
+from pet_doctor import BasicLLMPetDoctor, new_consultation_state
+from supplement_import import CatalogError, read_records
+
+
+def parse_case(line_no, record):
+    """입력 레코드 → {"id", "pet_info", "symptoms"} (형식 오류시 ValueError)"""
+    pet_info = record.get("pet_info")
+    if pet_info is None:
+        pet_info = {
+            "name": record.get("pet_name") or "",
+            "type": record.get("pet_type") or "개",
+            "age": record.get("pet_age") or 0,
+            "weight": record.get("pet_weight") or 0,
+        }
+    pet_info = dict(pet_info)
+    pet_info["age"] = int(float(pet_info.get("age") or 0))
+    pet_info["weight"] = float(pet_info.get("weight") or 0)
+
+    symptoms = (record.get("symptoms") or "").strip()
+    if not symptoms:
+        raise ValueError("symptoms 값 없음")
+    case_id = record.get("id")
+    return {
+        "id": str(case_id) if case_id not in (None, "") else str(line_no),
+        "pet_info": pet_info,
+        "symptoms": symptoms,
+    }
+
+
+def completed_ids(output_path):
+    """기존 결과 파일에서 성공한 id 집합 (중단으로 잘린 마지막 줄은 잘라냄)"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        # 마지막 줄이 끝나지 않았으면 다음 기록이 이어 붙지 않도록 제거
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+    for line in data.decode("utf-8").splitlines():
+        try:
+            result = json.loads(line)
+        except ValueError:
+            continue
+        if result.get("status") == "ok":
+            done.add(result["id"])
+        else:
+            done.discard(result.get("id"))
+    return done
+
+
+async def consult_case(system, case, persist=True, bypass_cache=False):
+    """한 건 상담 (예외는 결과의 error 로 기록)"""
+    result = {"id": case["id"], "pet_info": case["pet_info"], "symptoms": case["symptoms"]}
+    start = time.perf_counter()
+    try:
+        state = await system.aconsult(
+            new_consultation_state(case["pet_info"], case["symptoms"]),
+            bypass_cache=bypass_cache,
+            persist=persist,
+        )
+        result.update({
+            "status": "ok",
+            "emergency_level": state.get("emergency_level"),
+            "health_analysis": state.get("health_analysis"),
+            "supplement_recommendations": state.get("supplement_recommendations"),
+            "consultation_id": state.get("consultation_id"),
+            "node_timings": state.get("node_timings"),
+        })
+    except Exception as e:
+        result.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+async def consult_cases(system, cases, persist=True, bypass_cache=False):
+    return await asyncio.gather(*(consult_case(system, case, persist, bypass_cache) for case in cases))
+
+
+# 프로세스 풀 워커별 시스템 (워커마다 모델 1회 로드)
+_worker_system = None
+
+
+def _init_worker(model_path, inference_backend, db_path):
+    global _worker_system
+    _worker_system = BasicLLMPetDoctor(model_path=model_path, inference_backend=inference_backend, db_path=db_path)
+
+
+def _run_chunk(cases, persist, bypass_cache):
+    results = _worker_system.run_async(consult_cases(_worker_system, cases, persist, bypass_cache)).result()
+    # 풀 워커는 atexit 없이 종료되므로 상담 기록을 바로 저장
+    if persist:
+        _worker_system.consultation_writer.flush()
+    return results
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def bounded_results(submit, items, limit):
+    """items 를 최대 limit 개씩 동시에 제출하고 끝나는 순서대로 결과 반환"""
+    pending = set()
+    try:
+        for item in items:
+            pending.add(submit(item))
+            while len(pending) >= limit:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+class BatchStats:
+    """처리량/지연 시간 집계"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.ok = 0
+        self.errors = 0
+        self.latencies = []
+        self.node_seconds = {}
+
+    def add(self, result):
+        if result["status"] == "ok":
+            self.ok += 1
+            self.latencies.append(result["seconds"])
+            for node, seconds in (result.get("node_timings") or {}).items():
+                self.node_seconds[node] = self.node_seconds.get(node, 0.0) + seconds
+        else:
+            self.errors += 1
+
+    @property
+    def processed(self):
+        return self.ok + self.errors
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started_at
+        return {
+            "processed": self.processed,
+            "ok": self.ok,
+            "errors": self.errors,
+            "seconds": elapsed,
+            "cases_per_sec": self.processed / elapsed if elapsed > 0 else 0.0,
+            "p50": percentile(self.latencies, 0.5),
+            "p95": percentile(self.latencies, 0.95),
+            "max": max(self.latencies, default=0.0),
+            "node_avg": {node: total / self.ok for node, total in self.node_seconds.items()} if self.ok else {},
+        }
+
+
+def run_batch(path, output_path, processes=1, concurrency=8, model_path="models/finetuned_model",
+              inference_backend="fp32", db_path=DB_PATH, persist=True, bypass_cache=False,
+              file_format=None, progress_every=100):
+    """입력 파일 전체 상담 실행 후 통계 반환"""
+    done = completed_ids(output_path)
+    skipped = {"resumed": 0, "invalid": 0}
+
+    def cases():
+        for line_no, record in read_records(path, file_format):
+            try:
+                case = parse_case(line_no, record)
+            except (TypeError, ValueError) as e:
+                skipped["invalid"] += 1
+                print(f"  건너뜀 - {line_no}번째 줄: {e}", file=sys.stderr)
+                continue
+            if case["id"] in done:
+                skipped["resumed"] += 1
+                continue
+            done.add(case["id"])
+            yield case
+
+    system = None
+    if processes > 1:
+        # 워커 프로세스마다 모델을 로드하고 concurrency 건씩 묶어서 처리
+        executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_path, inference_backend, db_path),
+        )
+        results = bounded_results(
+            lambda chunk: executor.submit(_run_chunk, chunk, persist, bypass_cache),
+            _chunks(cases(), concurrency),
+            processes * 2,
+        )
+    else:
+        # 한 프로세스의 이벤트 루프에서 concurrency 건을 동시에 진행 (모델/캐시/배치 워커 공유)
+        system = BasicLLMPetDoctor(model_path=model_path, inference_backend=inference_backend, db_path=db_path)
+        system.wait_ready()
+        executor = None
+        results = bounded_results(
+            lambda case: system.run_async(consult_cases(system, [case], persist, bypass_cache)),
+            cases(),
+            concurrency,
+        )
+
+    stats = BatchStats()
+    try:
+        with open(output_path, "a", encoding="utf-8") as out:
+            for result in results:
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                stats.add(result)
+                if progress_every and stats.processed % progress_every == 0:
+                    summary = stats.summary()
+                    print(f"  {summary['processed']}건 처리 (오류 {summary['errors']}건, "
+                          f"{summary['cases_per_sec']:.2f}건/초)", file=sys.stderr)
+    finally:
+        results.close()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if system is not None:
+            system.close()
+
+    summary = stats.summary()
+    summary.update(skipped)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="상담 일괄 실행 (결과 JSONL, 중단 후 이어서 실행 가능)")
+    parser.add_argument("path", help="CSV 또는 JSONL 파일")
+    parser.add_argument("--output", required=True, help="결과 JSONL 경로 (있으면 이어서 기록)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="기본값: 확장자로 판단")
+    parser.add_argument("--processes", type=int, default=1, help="워커 프로세스 수 (프로세스마다 모델 로드)")
+    parser.add_argument("--concurrency", type=int, default=8, help="프로세스당 동시 상담 수")
+    parser.add_argument("--model-path", default="models/finetuned_model")
+    parser.add_argument("--backend", default=os.environ.get("PETDOCTOR_INFERENCE_BACKEND", "fp32"),
+                        choices=INFERENCE_BACKENDS)
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--no-save", action="store_true", help="상담 이력에 저장하지 않음 (평가용)")
+    parser.add_argument("--no-cache", action="store_true", help="LLM 응답 캐시를 쓰지 않음")
+    parser.add_argument("--progress-every", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    start_exporters()
+    try:
+        summary = run_batch(
+            args.path,
+            args.output,
+            processes=args.processes,
+            concurrency=args.concurrency,
+            model_path=args.model_path,
+            inference_backend=args.backend,
+            db_path=args.db,
+            persist=not args.no_save,
+            bypass_cache=args.no_cache,
+            file_format=args.format,
+            progress_every=args.progress_every,
+        )
+    except CatalogError as e:
+        print(f"실행 실패: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print("중단됨 - 같은 명령으로 다시 실행하면 이어서 처리합니다", file=sys.stderr)
+        return 130
+
+    print(f"{summary['processed']}건 처리 (성공 {summary['ok']}, 오류 {summary['errors']}), "
+          f"이전 실행분 {summary['resumed']}건 / 형식 오류 {summary['invalid']}건 건너뜀")
+    print(f"{summary['seconds']:.1f}초, {summary['cases_per_sec']:.2f}건/초, "
+          f"지연 p50 {summary['p50']:.2f}초 / p95 {summary['p95']:.2f}초 / 최대 {summary['max']:.2f}초")
+    for node, seconds in sorted(summary["node_avg"].items(), key=lambda item: -item[1]):
+        print(f"  {node:<24}{seconds * 1000:>10.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""코퍼스 임베딩 처리량 벤치마크 (chunks/sec)
+
+사용법:
+    python benchmarks/bench_embeddings.py --chunks 2000 --output bench_embeddings.json
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_pipeline import DEFAULT_MODEL, ParallelEmbeddings  # noqa: E402
+from rag_store import KNOWLEDGE_DIR, load_documents, split_corpus  # noqa: E402
+
+# (이름, 백엔드, 풀, 워커 수 - None 이면 CPU 코어 수)
+MODES = [
+    ("torch-serial", "torch", "thread", 1),
+    ("torch-threads", "torch", "thread", None),
+    ("torch-processes", "torch", "process", None),
+    ("int8-serial", "int8", "thread", 1),
+    ("int8-processes", "int8", "process", None),
+    ("onnx-int8-serial", "onnx", "thread", 1),
+    ("onnx-int8-processes", "onnx", "process", None),
+]
+
+
+def build_corpus(n_chunks):
+    """지식베이스 청크를 반복해 고정 크기 코퍼스 생성"""
+    chunks = [doc.page_content for doc in split_corpus(load_documents(KNOWLEDGE_DIR))]
+    if not chunks:
+        raise SystemExit(f"{KNOWLEDGE_DIR}/ 에 문서가 없습니다")
+    # 반복 청크도 실제로 다시 인코딩되도록 번호를 붙임
+    return [f"{chunks[i % len(chunks)]} ({i})" for i in range(n_chunks)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="임베딩 모드별 처리량 비교")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--modes", nargs="*", default=[m[0] for m in MODES])
+    parser.add_argument("--output", help="결과 JSON 경로")
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.chunks)
+    results = []
+    for name, backend, pool, workers in MODES:
+        if name not in args.modes:
+            continue
+        try:
+            embeddings = ParallelEmbeddings(
+                model_name=args.model, backend=backend, batch_size=args.batch_size,
+                workers=workers, pool=pool,
+            )
+            try:
+                # 워밍업 (풀 생성과 워커 프로세스 모델 로드 포함)
+                embeddings.embed_documents(corpus[: args.batch_size * embeddings.workers * 2])
+                embeddings.embed_documents(corpus)
+            finally:
+                embeddings.close()
+            results.append({"mode": name, **embeddings.last_stats})
+        except Exception as e:
+            print(f"{name}: 건너뜀 ({e})")
+            results.append({"mode": name, "error": str(e)})
+
+    print(f"\n{'mode':<22}{'chunks/sec':>12}{'seconds':>10}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['mode']:<22}{'-':>12}{'-':>10}")
+        else:
+            print(f"{r['mode']:<22}{r['chunks_per_sec']:>12.1f}{r['seconds']:>10.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"model": args.model, "chunks": len(corpus), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
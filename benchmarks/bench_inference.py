@@ -0,0 +1,136 @@
+"""파인튜닝 모델 추론 백엔드 벤치마크 (tokens/sec, 로드 후 RSS, fp32 대비 출력 차이)
+
+사용법:
+    python benchmarks/bench_inference.py --model-path models/finetuned_model --output bench_inference.json
+
+백엔드마다 별도 프로세스에서 실행하고, 메모리는 로드와 워밍업이 끝난 뒤의 상주 메모리(RSS)를 잰다.
+(프로세스 최대 RSS 는 로드 중 일시 사용량이 섞이므로 사용하지 않음)
+출력 차이는 같은 프롬프트의 fp32 응답과 비교한 일치율이다 (greedy 디코딩).
+"""
+import argparse
+import difflib
+import gc
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_utils import rss_mb  # noqa: E402
+from inference import generate_batch  # noqa: E402
+from model_backends import INFERENCE_BACKENDS, load_finetuned_model  # noqa: E402
+
+# 고정 프롬프트 세트
+PROMPTS = [
+    "7살 말티즈가 계단을 오를 때 뒷다리를 절뚝거려요. 어떤 문제일까요?",
+    "고양이가 이틀째 사료를 먹지 않고 구토를 두 번 했어요.",
+    "강아지가 귀를 자주 긁고 머리를 흔들어요. 귀에서 냄새가 나요.",
+    "12살 노령견이 밤에 기침을 자주 하고 산책을 힘들어해요.",
+    "고양이 소변에 피가 섞여 나오고 화장실을 자주 들락거려요.",
+    "3개월 된 강아지가 설사를 하는데 기운은 괜찮아 보여요.",
+    "강아지 털이 많이 빠지고 피부가 붉게 올라왔어요.",
+    "10kg 비글에게 관절 영양제를 먹여도 될까요?",
+]
+
+
+def _count_tokens(model, text):
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is not None:
+        return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+    return len(text.split())
+
+
+def run_backend(model_path, backend, max_new_tokens, result_queue):
+    """자식 프로세스: 모델 로드 후 프롬프트 세트 생성"""
+    try:
+        start = time.perf_counter()
+        model = load_finetuned_model(model_path, backend)
+        load_seconds = time.perf_counter() - start
+        # 백엔드 간 비교를 위해 샘플링 없이 생성 (format_prompt 를 제공하는 래퍼의 transformers 경로에 적용)
+        model.generation_kwargs = {"max_new_tokens": max_new_tokens, "do_sample": False}
+
+        generate_batch(model, PROMPTS[:1], [None])  # 워밍업
+        gc.collect()
+        resident_mb = rss_mb()
+        outputs = []
+        tokens = 0
+        start = time.perf_counter()
+        for prompt in PROMPTS:
+            output = generate_batch(model, [prompt], [None])[0]
+            outputs.append(output)
+            tokens += _count_tokens(model, output)
+        seconds = time.perf_counter() - start
+
+        result_queue.put({
+            "backend": backend,
+            "load_seconds": load_seconds,
+            "seconds": seconds,
+            "tokens": tokens,
+            "tokens_per_sec": tokens / seconds if seconds > 0 else 0.0,
+            "rss_mb": resident_mb,
+            "outputs": outputs,
+        })
+    except Exception as e:
+        result_queue.put({"backend": backend, "error": str(e)})
+
+
+def output_drift(baseline, outputs):
+    """fp32 대비 출력 차이 (완전 일치 비율, 평균 문자열 유사도)"""
+    exact = sum(a == b for a, b in zip(baseline, outputs))
+    similarity = [difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(baseline, outputs)]
+    return {
+        "exact_match": exact / len(baseline),
+        "mean_similarity": sum(similarity) / len(similarity),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="추론 백엔드별 속도/메모리/출력 차이 비교")
+    parser.add_argument("--model-path", default="models/finetuned_model")
+    parser.add_argument("--backends", nargs="*", default=list(INFERENCE_BACKENDS), choices=INFERENCE_BACKENDS)
+    parser.add_argument("--max-new-tokens", type=int, default=128)
+    parser.add_argument("--output", help="결과 JSON 경로")
+    args = parser.parse_args(argv)
+
+    # 출력 차이 기준이 되도록 fp32 를 항상 먼저 실행
+    backends = ["fp32"] + [b for b in args.backends if b != "fp32"]
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for backend in backends:
+        result_queue = ctx.Queue()
+        process = ctx.Process(target=run_backend, args=(args.model_path, backend, args.max_new_tokens, result_queue))
+        process.start()
+        result = result_queue.get()
+        process.join()
+        if "error" in result:
+            print(f"{backend}: 건너뜀 ({result['error']})")
+        results.append(result)
+
+    baseline = results[0].get("outputs")
+    for r in results:
+        if baseline and "outputs" in r:
+            r["drift"] = output_drift(baseline, r["outputs"])
+
+    print(f"\n{'backend':<10}{'tokens/sec':>12}{'RSS MB':>14}{'exact':>8}{'similarity':>12}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['backend']:<10}{'-':>12}{'-':>14}{'-':>8}{'-':>12}")
+            continue
+        drift = r.get("drift", {})
+        print(f"{r['backend']:<10}{r['tokens_per_sec']:>12.1f}{r['rss_mb']:>14.0f}"
+              f"{drift.get('exact_match', 0):>8.0%}{drift.get('mean_similarity', 0):>12.3f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "model_path": args.model_path,
+                "max_new_tokens": args.max_new_tokens,
+                "prompts": PROMPTS,
+                "results": results,
+            }, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""상담 파이프라인 전체 벤치마크 (노드별 지연, p50/p95/p99, 동시 처리량, 최대 RSS)
+
+사용법:
+    python benchmarks/bench_pipeline.py --output bench_pipeline.json
+    python benchmarks/bench_pipeline.py --models stub real --workers 1 4 16 --cases 200
+
+고정 시드로 만든 증상 케이스를 BasicLLMPetDoctor 비동기 그래프로 실행한다.
+stub 은 고정 지연만 있는 대체 모델(모델 외 구간 측정용), real 은 실제 파인튜닝 모델이다.
+설정(모델 × 동시 작업 수)마다 별도 프로세스와 임시 DB/저널을 쓰므로 RSS 와 상담 이력이 섞이지 않는다.
+LLM 응답 캐시는 사용하지 않는다 (같은 케이스 반복시에도 모델 호출 측정).
+결과 JSON 에 커밋 해시를 기록하므로 커밋 간 비교에 사용할 수 있다.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_utils import peak_rss_mb  # noqa: E402
+from metrics import percentile  # noqa: E402
+
+MODELS = ("stub", "real")
+
+# 케이스 생성 재료 (응급 키워드 포함 - 응급 케이스는 LLM 노드를 건너뜀)
+PET_TYPES = ("개", "고양이")
+SYMPTOM_PHRASES = [
+    "계단을 오를 때 뒷다리를 절뚝거려요",
+    "이틀째 사료를 먹지 않아요",
+    "구토를 두 번 했어요",
+    "귀를 자주 긁고 머리를 흔들어요",
+    "밤에 기침을 자주 해요",
+    "산책을 힘들어해요",
+    "소변에 피가 섞여 나와요",
+    "설사를 하는데 기운은 괜찮아 보여요",
+    "털이 많이 빠지고 피부가 붉어요",
+    "눈곱이 많이 끼고 눈을 비벼요",
+    "물을 평소보다 많이 마셔요",
+    "입냄새가 심해졌어요",
+    "경련을 일으켰어요",
+    "호흡곤란이 있어요",
+]
+
+# 노드 → 보고서 구간
+NODE_LABELS = {
+    "emergency_check": "emergency_check",
+    "embed_symptoms": "rag_embed",
+    "retrieve_context": "rag_retrieve",
+    "select_supplements": "supplement_rank",
+    "analyze_symptoms": "llm_analyze",
+    "recommend_supplements": "llm_recommend",
+    "save_consultation": "db_save",
+}
+
+
+def make_corpus(count, seed):
+    """시드 고정 증상 케이스"""
+    rng = random.Random(seed)
+    cases = []
+    for i in range(count):
+        pet_type = rng.choice(PET_TYPES)
+        phrases = rng.sample(SYMPTOM_PHRASES, rng.randint(1, 3))
+        cases.append({
+            "pet_info": {
+                "name": f"bench-{i}",
+                "type": pet_type,
+                "age": rng.randint(0, 15),
+                "weight": round(rng.uniform(2, 35) if pet_type == "개" else rng.uniform(2, 7), 1),
+            },
+            "symptoms": ", ".join(phrases),
+        })
+    return cases
+
+
+class StubModel:
+    """고정 지연 대체 모델 (배치 생성은 한 번의 지연으로 처리)"""
+
+    def __init__(self, latency=0.2):
+        self.latency = latency
+        self.generation_kwargs = {"stub_latency": latency}
+
+    def _reply(self, prompt):
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        return f"[stub {digest}] 증상으로 보아 경과 관찰이 필요하며, 지속되면 동물병원 진료를 권장합니다."
+
+    def generate_response(self, prompt, context=None):
+        time.sleep(self.latency)
+        return self._reply(prompt)
+
+    def generate_batch(self, prompts, contexts=None):
+        time.sleep(self.latency)
+        return [self._reply(p) for p in prompts]
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+    return {
+        "p50": percentile(values, 0.50),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "mean": sum(values) / len(values),
+        "max": max(values),
+    }
+
+
+async def _run_cases(system, cases, workers):
+    """workers 건씩 동시에 상담 실행 → [(지연, 상태 또는 예외)]"""
+    from pet_doctor import new_consultation_state
+
+    semaphore = asyncio.Semaphore(workers)
+
+    async def one(case):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                state = await system.aconsult(
+                    new_consultation_state(case["pet_info"], case["symptoms"]), bypass_cache=True
+                )
+            except Exception as e:
+                return time.perf_counter() - start, e
+            return time.perf_counter() - start, state
+
+    return await asyncio.gather(*(one(case) for case in cases))
+
+
+def run_config(model, workers, cases, warmup, args, result_queue):
+    """자식 프로세스: 임시 DB/저널로 시스템을 만들고 케이스 실행"""
+    try:
+        work_dir = tempfile.mkdtemp(prefix="bench-pipeline-")
+        # pet_doctor 임포트 전에 설정해야 저널 경로에 반영됨
+        os.environ["PETDOCTOR_JOURNAL_DIR"] = os.path.join(work_dir, "journal")
+        os.environ["PETDOCTOR_LLM_CACHE"] = "0"
+        from pet_doctor import BasicLLMPetDoctor
+
+        start = time.perf_counter()
+        system = BasicLLMPetDoctor(
+            model_path=args.model_path,
+            inference_backend=args.backend,
+            db_path=os.path.join(work_dir, "bench.db"),
+            model=StubModel(args.stub_latency) if model == "stub" else None,
+        )
+        system.wait_ready()
+        load_seconds = time.perf_counter() - start
+
+        system.run_async(_run_cases(system, warmup, workers)).result()
+        system.query_cache.clear()
+
+        start = time.perf_counter()
+        outcomes = system.run_async(_run_cases(system, cases, workers)).result()
+        seconds = time.perf_counter() - start
+        system.close()
+
+        latencies = []
+        nodes = {}
+        errors = []
+        emergencies = 0
+        for latency, state in outcomes:
+            if isinstance(state, Exception):
+                errors.append(f"{type(state).__name__}: {state}")
+                continue
+            latencies.append(latency)
+            emergencies += bool(state.get("emergency_level"))
+            for node, node_seconds in (state.get("node_timings") or {}).items():
+                nodes.setdefault(NODE_LABELS.get(node, node), []).append(node_seconds)
+
+        result_queue.put({
+            "model": model,
+            "workers": workers,
+            "cases": len(cases),
+            "errors": len(errors),
+            "error_samples": errors[:5],
+            "emergency_cases": emergencies,
+            "load_seconds": load_seconds,
+            "seconds": seconds,
+            "throughput": len(latencies) / seconds if seconds > 0 else 0.0,
+            "latency": percentiles(latencies),
+            "nodes": {label: dict(percentiles(values), count=len(values)) for label, values in nodes.items()},
+            "peak_rss_mb": peak_rss_mb(),
+        })
+    except Exception as e:
+        result_queue.put({"model": model, "workers": workers, "error": f"{type(e).__name__}: {e}"})
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="상담 파이프라인 노드별 지연/처리량/메모리 측정")
+    parser.add_argument("--models", nargs="*", default=["stub"], choices=MODELS)
+    parser.add_argument("--workers", nargs="*", type=int, default=[1, 4, 16], help="동시 상담 수 목록")
+    parser.add_argument("--cases", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stub-latency", type=float, default=0.2, help="대체 모델 호출당 지연 (초)")
+    parser.add_argument("--model-path", default="models/finetuned_model")
+    parser.add_argument("--backend", default=os.environ.get("PETDOCTOR_INFERENCE_BACKEND", "fp32"))
+    parser.add_argument("--output", help="결과 JSON 경로")
+    args = parser.parse_args(argv)
+
+    cases = make_corpus(args.cases, args.seed)
+    # 워밍업 케이스는 측정 케이스와 겹치지 않도록 다른 시드
+    warmup = make_corpus(args.warmup, args.seed + 1)
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for model in args.models:
+        for workers in args.workers:
+            result_queue = ctx.Queue()
+            process = ctx.Process(target=run_config, args=(model, workers, cases, warmup, args, result_queue))
+            process.start()
+            result = result_queue.get()
+            process.join()
+            if "error" in result:
+                print(f"{model} x{workers}: 건너뜀 ({result['error']})")
+            results.append(result)
+
+    print(f"\n{'model':<6}{'workers':>8}{'cases/s':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'RSS MB':>9}{'errors':>8}")
+    for r in results:
+        if "error" in r:
+            continue
+        latency = r["latency"]
+        print(f"{r['model']:<6}{r['workers']:>8}{r['throughput']:>10.2f}{latency['p50']:>9.3f}"
+              f"{latency['p95']:>9.3f}{latency['p99']:>9.3f}{r['peak_rss_mb']:>9.0f}{r['errors']:>8}")
+
+    for r in results:
+        if "error" in r:
+            continue
+        print(f"\n[{r['model']} x{r['workers']}] 노드별 지연 (ms)")
+        print(f"  {'node':<18}{'p50':>9}{'p95':>9}{'p99':>9}{'count':>7}")
+        for label in dict.fromkeys(NODE_LABELS.values()):
+            node = r["nodes"].get(label)
+            if node:
+                print(f"  {label:<18}{node['p50'] * 1000:>9.1f}{node['p95'] * 1000:>9.1f}"
+                      f"{node['p99'] * 1000:>9.1f}{node['count']:>7}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "seed": args.seed,
+                "cases": args.cases,
+                "warmup": args.warmup,
+                "stub_latency": args.stub_latency,
+                "backend": args.backend,
+                "results": results,
+            }, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
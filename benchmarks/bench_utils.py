@@ -0,0 +1,20 @@
+"""벤치마크 공용 도구 (메모리 측정)"""
+import os
+import resource
+import sys
+
+
+def peak_rss_mb():
+    """프로세스 최대 RSS (MB)"""
+    # Linux 는 KB, macOS 는 바이트 단위
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def rss_mb():
+    """현재 상주 메모리 (/proc/self/statm, 없으면 프로세스 최대 RSS 로 대체)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return peak_rss_mb()
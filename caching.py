@@ -0,0 +1,221 @@
+"""요청 경로 캐시"""
+import hashlib
+import json
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from db import ConnectionPool
+
+RESPONSE_CACHE_PATH = os.environ.get("PETDOCTOR_LLM_CACHE_PATH", "llm_cache.db")
+
+
+def normalize_text(text: str) -> str:
+    """캐시 키용 텍스트 정규화 (유니코드 NFKC, 소문자, 공백 정리)"""
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+def normalize_whitespace(text: str) -> str:
+    """공백만 정리 (대소문자/문자 형태는 응답에 영향을 주므로 유지)"""
+    return " ".join(text.split())
+
+
+class TTLCache:
+    """크기 제한 LRU + TTL 캐시 (스레드 안전)"""
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if self.ttl is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+def response_cache_key(model_id, prompt, context=None, params=None):
+    """모델/프롬프트/컨텍스트/생성 파라미터 기준 응답 캐시 키"""
+    payload = json.dumps(
+        [model_id, normalize_whitespace(prompt), normalize_whitespace(context or ""), params or {}],
+        ensure_ascii=False, sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """LLM 응답 디스크 캐시 (SQLite, LRU + TTL, 항목 수/용량 제한)
+
+    프로세스 재시작 후에도 유지되며, 같은 파일을 여러 워커가 공유할 수 있다.
+    항목 수/용량 합계는 트리거가 갱신하는 한 행 테이블에 두어 쓰기마다 전체를 집계하지 않고,
+    제한을 넘으면 low_water 비율까지 한 번에 줄인다. 만료 항목은 expire_every 번 쓰기마다 정리한다.
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, ttl=7 * 24 * 3600, max_entries=10000,
+                 max_bytes=64 * 1024 * 1024, low_water=0.9, expire_every=100):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.expire_every = expire_every
+        self.pool = ConnectionPool(path, size=4)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        with self.pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL,
+                    accessed_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_response_cache_accessed ON response_cache (accessed_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_response_cache_expires ON response_cache (expires_at)')
+            # 항목 수/용량 누적 합계 (여러 프로세스가 같은 파일을 써도 맞도록 트리거로 갱신)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS response_cache_stats (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    entries INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL
+                )
+            ''')
+            conn.execute('''
+                INSERT OR IGNORE INTO response_cache_stats (id, entries, bytes)
+                SELECT 1, COUNT(*), COALESCE(SUM(size), 0) FROM response_cache
+            ''')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS response_cache_stats_insert AFTER INSERT ON response_cache BEGIN
+                    UPDATE response_cache_stats SET entries = entries + 1, bytes = bytes + new.size WHERE id = 1;
+                END
+            ''')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS response_cache_stats_delete AFTER DELETE ON response_cache BEGIN
+                    UPDATE response_cache_stats SET entries = entries - 1, bytes = bytes - old.size WHERE id = 1;
+                END
+            ''')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS response_cache_stats_resize AFTER UPDATE OF size ON response_cache BEGIN
+                    UPDATE response_cache_stats SET bytes = bytes + new.size - old.size WHERE id = 1;
+                END
+            ''')
+
+    def get(self, key):
+        now = time.time()
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT response FROM response_cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE response_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return row[0]
+
+    def set(self, key, response):
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._writes += 1
+            expire = self._writes % self.expire_every == 0
+        with self.pool.connection() as conn:
+            # REPLACE 는 기존 행 삭제시 트리거를 실행하지 않으므로 UPSERT 로 합계 유지
+            conn.execute(
+                "INSERT INTO response_cache (key, response, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET response = excluded.response, size = excluded.size, "
+                "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                (key, response, len(response.encode("utf-8")), expires_at, now)
+            )
+            if expire:
+                self._expire(conn, now)
+            self._evict(conn, now)
+
+    def _totals(self, conn):
+        return conn.execute("SELECT entries, bytes FROM response_cache_stats WHERE id = 1").fetchone()
+
+    def _expire(self, conn, now):
+        conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+
+    def _evict(self, conn, now):
+        """제한을 넘으면 만료 항목부터, 그래도 넘으면 오래 사용하지 않은 순으로 low_water 까지 삭제"""
+        count, total = self._totals(conn)
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        self._expire(conn, now)
+        count, total = self._totals(conn)
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # 오래된 순으로 누적 용량을 계산해 잘라낼 경계 찾기
+        excess_count = max(count - int(self.max_entries * self.low_water), 0)
+        excess_bytes = max(total - int(self.max_bytes * self.low_water), 0)
+        removed = freed = 0
+        cutoff = None
+        for accessed_at, size in conn.execute("SELECT accessed_at, size FROM response_cache ORDER BY accessed_at"):
+            removed += 1
+            freed += size
+            cutoff = accessed_at
+            if removed >= excess_count and freed >= excess_bytes:
+                break
+        conn.execute("DELETE FROM response_cache WHERE accessed_at <= ?", (cutoff,))
+
+    def clear(self):
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM response_cache")
+
+    def stats(self):
+        count, total = self.pool.query_one("SELECT entries, bytes FROM response_cache_stats WHERE id = 1")
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": count,
+                "bytes": total,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
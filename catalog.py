@@ -0,0 +1,63 @@
+"""영양제 카탈로그 조회 (필터/페이지네이션은 SQL 에서 처리)"""
+import math
+
+
+def catalog_version(pool):
+    """영양제 테이블이 바뀔 때마다 증가하는 값 (트리거로 관리)"""
+    row = pool.query_one("SELECT version FROM catalog_version WHERE id = 1")
+    return row[0] if row else 0
+
+
+def catalog_bounds(pool):
+    """카테고리 목록과 가격 범위 (필터 위젯 초기값)"""
+    categories = [row[0] for row in pool.query(
+        "SELECT DISTINCT category FROM supplements ORDER BY category"
+    )]
+    min_price, max_price = pool.query_one("SELECT MIN(price), MAX(price) FROM supplements")
+    return {
+        "categories": categories,
+        # 정수 슬라이더가 소수점 가격을 빠뜨리지 않도록 바깥쪽으로 반올림
+        "min_price": math.floor(min_price or 0),
+        "max_price": math.ceil(max_price or 0),
+    }
+
+
+def _filter_clause(category=None, min_price=None, max_price=None, min_rating=None):
+    conditions = []
+    params = []
+    if category:
+        conditions.append("category = ?")
+        params.append(category)
+    if min_rating:
+        conditions.append("rating >= ?")
+        params.append(min_rating)
+    if min_price is not None:
+        conditions.append("price >= ?")
+        params.append(min_price)
+    if max_price is not None:
+        conditions.append("price <= ?")
+        params.append(max_price)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where, params
+
+
+def count_supplements(pool, category=None, min_price=None, max_price=None, min_rating=None):
+    where, params = _filter_clause(category, min_price, max_price, min_rating)
+    return pool.query_one(f"SELECT COUNT(*) FROM supplements {where}", params)[0]
+
+
+def query_supplements(pool, category=None, min_price=None, max_price=None, min_rating=None,
+                      page=1, page_size=20):
+    """필터 조건에 맞는 영양제 한 페이지 조회 (카테고리, 평점순)
+
+    (category, rating DESC, price) 인덱스를 따라 정렬하므로 카테고리를 지정하면
+    정렬 없이 범위 검색 후 필요한 행만 읽는다.
+    """
+    where, params = _filter_clause(category, min_price, max_price, min_rating)
+    sql = f'''
+        SELECT * FROM supplements
+        {where}
+        ORDER BY category, rating DESC, price, id
+        LIMIT ? OFFSET ?
+    '''
+    return pool.read_dataframe(sql, params=(*params, page_size, (page - 1) * page_size))
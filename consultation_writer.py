@@ -0,0 +1,244 @@
+"""상담 기록 write-behind 큐
+
+상담 결과는 로컬 저널에 append 한 뒤 메모리 큐에 쌓이고, 백그라운드 스레드가
+건수/시간 기준으로 모아서 executemany 한 트랜잭션으로 저장한다.
+ID는 DB에서 블록 단위로 미리 예약하므로 저장 전에 바로 반환할 수 있다.
+"""
+import atexit
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: 단일 프로세스 가정
+    fcntl = None
+
+JOURNAL_DIR = os.environ.get("PETDOCTOR_JOURNAL_DIR", "consultation_journal")
+
+COLUMNS = (
+    "id", "pet_name", "pet_type", "pet_age", "pet_weight",
+    "symptoms", "health_analysis", "recommendations", "timestamp",
+)
+
+# 일반 저장: ID 충돌은 오류로 드러나야 함 (무시하면 상담 기록이 조용히 사라짐)
+INSERT_SQL = f'''
+    INSERT INTO consultations ({", ".join(COLUMNS)})
+    VALUES ({", ".join("?" for _ in COLUMNS)})
+'''
+
+# 저널 재생 전용: 이미 저장된 뒤 삭제 전에 중단된 세그먼트는 같은 행이므로 무시
+REPLAY_SQL = INSERT_SQL.replace("INSERT INTO", "INSERT OR IGNORE INTO", 1)
+
+
+def _try_lock(f):
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _read_journal(path):
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                rows.append(tuple(json.loads(line)))
+            except ValueError:
+                # 기록 도중 중단된 마지막 줄
+                break
+    return rows
+
+
+class ConsultationWriter:
+    """상담 기록 배치 저장기"""
+
+    def __init__(self, pool, journal_dir=JOURNAL_DIR, batch_size=50, flush_interval=1.0,
+                 id_block_size=100, fsync=False):
+        self.pool = pool
+        self.journal_dir = journal_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.id_block_size = id_block_size
+        self.fsync = fsync
+
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._id_lock = threading.Lock()
+        self._pending = []
+        self._sealed = []
+        self._next_id = 0
+        self._block_end = 0
+        self._stopped = False
+        self.flushed_rows = 0
+        self.flushed_batches = 0
+
+        os.makedirs(journal_dir, exist_ok=True)
+        self.replay()
+        self._journal = self._open_segment()
+
+        self._thread = threading.Thread(target=self._run, name="consultation-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _open_segment(self):
+        """프로세스 전용 저널 세그먼트 (잠금으로 다른 프로세스의 재생 방지)"""
+        path = os.path.join(self.journal_dir, f"{os.getpid()}-{uuid.uuid4().hex}.jsonl")
+        f = open(path, "a", encoding="utf-8")
+        _try_lock(f)
+        return f
+
+    def replay(self):
+        """다른 프로세스가 잠그고 있지 않은 (비정상 종료된) 저널을 DB에 반영"""
+        replayed = 0
+        for path in sorted(glob.glob(os.path.join(self.journal_dir, "*.jsonl"))):
+            with open(path, "a+", encoding="utf-8") as f:
+                if not _try_lock(f):
+                    continue
+                rows = _read_journal(path)
+                if rows:
+                    with self.pool.connection() as conn:
+                        conn.executemany(REPLAY_SQL, rows)
+                    replayed += len(rows)
+                os.remove(path)
+        if replayed:
+            print(f"상담 저널 재생: {replayed}건 복구")
+        return replayed
+
+    def allocate_id(self):
+        """상담 ID 예약 (DB에서 블록 단위로 받아 프로세스 간 충돌 방지)"""
+        with self._id_lock:
+            if self._next_id >= self._block_end:
+                self._next_id, self._block_end = self._reserve_block()
+            consultation_id = self._next_id
+            self._next_id += 1
+            return consultation_id
+
+    def reset_ids(self):
+        """예약해 둔 ID 블록 폐기 (DB 초기화 후 다음 할당은 새 블록에서)"""
+        with self._id_lock:
+            self._next_id = self._block_end = 0
+
+    def _reserve_block(self):
+        with self.pool.connection("reserve_ids") as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT next_id FROM id_allocator WHERE name = 'consultations'").fetchone()
+            max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM consultations").fetchone()[0]
+            start = max(row[0] if row else 1, max_id + 1)
+            end = start + self.id_block_size
+            conn.execute(
+                "INSERT INTO id_allocator (name, next_id) VALUES ('consultations', ?) "
+                "ON CONFLICT(name) DO UPDATE SET next_id = excluded.next_id",
+                (end,)
+            )
+        return start, end
+
+    def enqueue(self, pet_info, symptoms, health_analysis, recommendations_json):
+        """저널 기록 후 큐에 추가, 예약된 상담 ID 즉시 반환"""
+        consultation_id = self.allocate_id()
+        row = (
+            consultation_id,
+            pet_info['name'],
+            pet_info['type'],
+            pet_info['age'],
+            pet_info['weight'],
+            symptoms,
+            health_analysis,
+            recommendations_json,
+            time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),  # CURRENT_TIMESTAMP 와 같은 UTC 형식
+        )
+        line = json.dumps(row, ensure_ascii=False) + "\n"
+
+        with self._cond:
+            self._journal.write(line)
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        return consultation_id
+
+    def flush(self):
+        """대기 중인 기록을 한 트랜잭션으로 저장"""
+        with self._flush_lock:
+            with self._cond:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, []
+                # 새 기록은 새 세그먼트에 쓰고, 이번 배치가 저장되면 이전 세그먼트 삭제
+                self._sealed.append(self._journal)
+                self._journal = self._open_segment()
+
+            try:
+                try:
+                    with self.pool.connection("consultation_flush") as conn:
+                        conn.executemany(INSERT_SQL, batch)
+                except sqlite3.IntegrityError as e:
+                    # 예약 블록이 다른 프로세스와 겹침 (다른 프로세스의 DB 초기화 등)
+                    # 기록은 버리지 않고 새 블록의 ID로 다시 저장
+                    print(f"상담 ID 충돌, 새 ID로 다시 저장합니다: {e}")
+                    self.reset_ids()
+                    batch = self._store_with_new_ids(batch)
+            except Exception:
+                with self._cond:
+                    self._pending[:0] = batch
+                raise
+
+            for f in self._sealed:
+                os.remove(f.name)
+                f.close()
+            self._sealed = []
+            self.flushed_rows += len(batch)
+            self.flushed_batches += 1
+            return len(batch)
+
+    def _store_with_new_ids(self, batch):
+        """이미 있는 ID를 쓴 행만 새로 예약한 ID로 바꿔 저장"""
+        stored = []
+        for row in batch:
+            if self.pool.query_one("SELECT 1 FROM consultations WHERE id = ?", (row[0],)):
+                row = (self.allocate_id(),) + tuple(row[1:])
+            stored.append(row)
+        with self.pool.connection("consultation_flush") as conn:
+            conn.executemany(INSERT_SQL, stored)
+        return stored
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopped or len(self._pending) >= self.batch_size,
+                    timeout=self.flush_interval,
+                )
+                stopped = self._stopped
+            try:
+                self.flush()
+            except Exception as e:
+                # 저널에 남아 있으므로 다음 주기 또는 재시작시 다시 저장됨
+                print(f"상담 기록 저장 오류: {e}")
+            if stopped:
+                return
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._pending)
+
+    def close(self):
+        """남은 기록을 저장하고 백그라운드 스레드 종료"""
+        with self._cond:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join()
+        if not self._pending:
+            os.remove(self._journal.name)
+        self._journal.close()
@@ -0,0 +1,137 @@
+"""SQLite 커넥션 풀 / 데이터 접근 계층"""
+import contextlib
+import os
+import queue
+import sqlite3
+import threading
+
+import pandas as pd
+
+from metrics import span
+
+DB_PATH = os.environ.get("PETDOCTOR_DB_PATH", "pet_consultations.db")
+
+# 커넥션 생성 시 1회 적용
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",        # 읽기와 쓰기가 서로 막지 않음
+    "PRAGMA synchronous=NORMAL",      # WAL 모드에서는 체크포인트 시에만 fsync
+    "PRAGMA busy_timeout=5000",       # 잠금 충돌시 바로 실패하지 않고 대기
+    "PRAGMA cache_size=-16000",       # 커넥션당 페이지 캐시 16MB
+    "PRAGMA mmap_size=268435456",     # 256MB 메모리 매핑 읽기
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class ConnectionPool:
+    """스레드 안전 SQLite 커넥션 풀
+
+    커넥션을 재사용하므로 sqlite3 의 커넥션별 prepared statement 캐시가
+    요청 사이에도 유지됨 (같은 SQL 문자열은 다시 컴파일하지 않음).
+    """
+
+    def __init__(self, path=DB_PATH, size=8, cached_statements=256):
+        self.path = path
+        self.size = size
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            timeout=5.0,
+            cached_statements=self.cached_statements,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        # 풀이 가득 찼으면 반환될 때까지 대기
+        return self._idle.get()
+
+    def _release(self, conn):
+        self._idle.put(conn)
+
+    @contextlib.contextmanager
+    def connection(self, op="transaction"):
+        """트랜잭션 단위 커넥션 (정상 종료시 commit, 예외시 rollback)
+
+        풀 대기 시간을 포함한 트랜잭션 전체를 sqlite span 으로 기록한다.
+        """
+        with span("sqlite", op=op):
+            conn = self._acquire()
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._release(conn)
+
+    def query(self, sql, params=()):
+        with self.connection("query") as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        with self.connection("query") as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def execute(self, sql, params=()):
+        """쓰기 쿼리 실행 후 lastrowid 반환"""
+        with self.connection("execute") as conn:
+            return conn.execute(sql, params).lastrowid
+
+    def executemany(self, sql, seq_of_params):
+        with self.connection("executemany") as conn:
+            return conn.executemany(sql, seq_of_params).rowcount
+
+    def read_dataframe(self, sql, params=()):
+        with self.connection("read_dataframe") as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def close(self):
+        """유휴 커넥션 모두 닫기"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=DB_PATH):
+    """DB 파일별 공유 커넥션 풀"""
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path)
+        return pool
@@ -0,0 +1,151 @@
+"""코퍼스 빌드용 배치/멀티코어 임베딩"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List
+
+from langchain.embeddings import HuggingFaceEmbeddings
+from langchain.embeddings.base import Embeddings
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+BACKENDS = ("torch", "int8", "onnx")
+# sentence-transformers 허브 저장소에 포함된 int8 양자화 ONNX 그래프
+DEFAULT_ONNX_FILE = "onnx/model_qint8_avx2.onnx"
+
+
+def make_embeddings(model_name=DEFAULT_MODEL, backend="torch", batch_size=64, onnx_file=DEFAULT_ONNX_FILE):
+    """CPU 인코더 생성 (torch fp32 / torch 동적 int8 / ONNX Runtime int8)"""
+    if backend not in BACKENDS:
+        raise ValueError(f"지원하지 않는 임베딩 백엔드: {backend} ({', '.join(BACKENDS)})")
+
+    model_kwargs = {"device": "cpu"}
+    if backend == "onnx":
+        # sentence-transformers>=3.2 + optimum[onnxruntime] 필요
+        model_kwargs.update({"backend": "onnx", "model_kwargs": {"file_name": onnx_file}})
+
+    embeddings = HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs=model_kwargs,
+        encode_kwargs={"batch_size": batch_size},
+    )
+
+    if backend == "int8":
+        import torch
+
+        torch.quantization.quantize_dynamic(embeddings.client, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return embeddings
+
+
+def embedding_model_id(model_name=DEFAULT_MODEL, backend="torch"):
+    """인덱스 캐시 키용 모델 식별자 (양자화 백엔드는 벡터가 달라지므로 구분)"""
+    return model_name if backend == "torch" else f"{model_name}:{backend}"
+
+
+# 프로세스 풀 워커별 인코더
+_worker_embeddings = None
+
+
+def _init_worker(model_name, backend, batch_size, onnx_file, torch_threads):
+    global _worker_embeddings
+    import torch
+
+    torch.set_num_threads(torch_threads)
+    _worker_embeddings = make_embeddings(model_name, backend, batch_size, onnx_file)
+
+
+def _embed_in_worker(texts):
+    return _worker_embeddings.embed_documents(texts)
+
+
+class ParallelEmbeddings(Embeddings):
+    """청크를 배치로 나눠 스레드/프로세스 풀에서 임베딩"""
+
+    def __init__(self, model_name=DEFAULT_MODEL, backend="torch", batch_size=64,
+                 workers=None, pool="thread", onnx_file=DEFAULT_ONNX_FILE):
+        if pool not in ("thread", "process"):
+            raise ValueError(f"지원하지 않는 풀 종류: {pool}")
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = pool
+        self.onnx_file = onnx_file
+        self.base = make_embeddings(model_name, backend, batch_size, onnx_file)
+        self.last_stats = None
+        # 풀은 첫 병렬 호출 때 한 번만 생성 (프로세스 풀은 워커마다 모델을 다시 로드하므로 재사용)
+        self.executor = None
+        self.executor_lock = threading.Lock()
+
+    @property
+    def model_id(self):
+        return embedding_model_id(self.model_name, self.backend)
+
+    def _executor(self):
+        with self.executor_lock:
+            if self.executor is None:
+                if self.pool == "thread":
+                    self.executor = ThreadPoolExecutor(max_workers=self.workers)
+                else:
+                    # 코어당 프로세스 1개, 프로세스마다 torch 스레드를 나눠 과다 구독 방지
+                    # fork 는 부모의 torch 스레드 풀/잠금 상태를 복사해 교착될 수 있으므로 spawn 사용
+                    torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+                    self.executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                        initargs=(self.model_name, self.backend, self.batch_size, self.onnx_file, torch_threads),
+                    )
+            return self.executor
+
+    def close(self):
+        """스레드/프로세스 풀 종료"""
+        with self.executor_lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+                self.executor = None
+
+    def _batches(self, texts):
+        return [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        batches = self._batches(list(texts))
+
+        if self.workers <= 1 or len(batches) <= 1:
+            vectors = self.base.embed_documents(list(texts))
+        else:
+            # thread: torch 연산은 GIL을 해제하므로 하나의 모델을 스레드가 공유
+            # process: 워커마다 초기화 때 로드한 인코더 사용
+            embed = self.base.embed_documents if self.pool == "thread" else _embed_in_worker
+            vectors = [v for batch in self._executor().map(embed, batches) for v in batch]
+
+        elapsed = time.perf_counter() - start
+        self.last_stats = {
+            "chunks": len(texts),
+            "seconds": elapsed,
+            "chunks_per_sec": len(texts) / elapsed if elapsed > 0 else 0.0,
+            "backend": self.backend,
+            "pool": self.pool,
+            "workers": self.workers,
+            "batch_size": self.batch_size,
+        }
+        if texts:
+            print(f"임베딩 {len(texts)}개 청크: {self.last_stats['chunks_per_sec']:.1f} chunks/sec "
+                  f"({self.backend}, {self.pool} x{self.workers}, batch {self.batch_size})")
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.base.embed_query(text)
+
+
+def embeddings_from_env():
+    """환경 변수 기반 임베딩 설정"""
+    return ParallelEmbeddings(
+        model_name=os.environ.get("PETDOCTOR_EMBEDDING_MODEL", DEFAULT_MODEL),
+        backend=os.environ.get("PETDOCTOR_EMBEDDING_BACKEND", "torch"),
+        batch_size=int(os.environ.get("PETDOCTOR_EMBEDDING_BATCH_SIZE", "64")),
+        workers=int(os.environ.get("PETDOCTOR_EMBEDDING_WORKERS", "0")) or None,
+        pool=os.environ.get("PETDOCTOR_EMBEDDING_POOL", "thread"),
+    )
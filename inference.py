@@ -0,0 +1,226 @@
+"""파인튜닝 모델 래퍼 추론 어댑터"""
+import bisect
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# 요청 지연 시간 히스토그램 구간 (초)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+
+
+def _raw_hf_model(model):
+    """래퍼가 format_prompt 로 자체 프롬프트 템플릿을 노출할 때만 (transformers 모델, 토크나이저)
+
+    템플릿을 모르는 래퍼에서 generate 를 직접 호출하면 파인튜닝 프롬프트/생성 설정이 바뀌므로
+    그 경우에는 None 을 반환하고 generate_response 를 사용한다.
+    """
+    hf_model = getattr(model, "model", None)
+    tokenizer = getattr(model, "tokenizer", None)
+    if not hasattr(model, "format_prompt") or tokenizer is None or not hasattr(hf_model, "generate"):
+        return None
+    return hf_model, tokenizer
+
+
+def _generation_kwargs(model):
+    # 지정이 없으면 모델 generation_config 기본값 사용
+    return dict(getattr(model, "generation_kwargs", None) or {})
+
+
+def supports_batching(model):
+    """한 번의 호출로 여러 프롬프트를 생성할 수 있는지 (아니면 배치 워커는 요청을 직렬화할 뿐)"""
+    return hasattr(model, "generate_batch") or _raw_hf_model(model) is not None
+
+
+def stream_generate(model, prompt, context=None):
+    """모델 응답을 토큰(텍스트 조각) 단위로 생성
+
+    1. 래퍼가 stream_response(prompt, context=...) 제너레이터를 제공하면 그대로 사용
+    2. 래퍼가 format_prompt 와 transformers model/tokenizer 를 노출하면 TextIteratorStreamer 로 스트리밍
+    3. 그 외에는 generate_response 결과를 한 번에 반환
+    """
+    if hasattr(model, "stream_response"):
+        yield from model.stream_response(prompt, context=context)
+        return
+
+    raw = _raw_hf_model(model)
+    if raw is None:
+        yield model.generate_response(prompt, context=context)
+        return
+    hf_model, tokenizer = raw
+
+    from transformers import TextIteratorStreamer
+
+    text = model.format_prompt(prompt, context=context)
+    inputs = tokenizer(text, return_tensors="pt").to(hf_model.device)
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    generation_kwargs = _generation_kwargs(model)
+
+    errors = []
+
+    def run():
+        try:
+            hf_model.generate(**inputs, streamer=streamer, **generation_kwargs)
+        except Exception as e:
+            errors.append(e)
+            # 소비자가 멈추지 않도록 스트림 종료
+            streamer.end()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    yield from streamer
+    thread.join()
+    if errors:
+        raise errors[0]
+
+
+def generate_batch(model, prompts, contexts):
+    """여러 프롬프트를 한 번에 생성
+
+    1. 래퍼가 generate_batch(prompts, contexts=...) 를 제공하면 그대로 사용
+    2. 래퍼가 format_prompt 와 transformers model/tokenizer 를 노출하면 왼쪽 패딩 배치로 generate 1회
+    3. 그 외에는 generate_response 를 순서대로 호출
+    """
+    if hasattr(model, "generate_batch"):
+        return model.generate_batch(prompts, contexts=contexts)
+
+    raw = _raw_hf_model(model)
+    if raw is None:
+        return [model.generate_response(p, context=c) for p, c in zip(prompts, contexts)]
+    hf_model, tokenizer = raw
+
+    texts = [model.format_prompt(p, context=c) for p, c in zip(prompts, contexts)]
+    # 디코더 모델은 생성이 오른쪽에서 이어지므로 패딩은 왼쪽에
+    padding_side = tokenizer.padding_side
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    try:
+        inputs = tokenizer(texts, return_tensors="pt", padding=True).to(hf_model.device)
+    finally:
+        tokenizer.padding_side = padding_side
+
+    generation_kwargs = _generation_kwargs(model)
+    generation_kwargs.setdefault("pad_token_id", tokenizer.pad_token_id)
+    outputs = hf_model.generate(**inputs, **generation_kwargs)
+    new_tokens = outputs[:, inputs["input_ids"].shape[1]:]
+    return tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+
+
+class InferenceBatcher:
+    """동시 요청을 짧은 시간 모아 배치로 생성하는 추론 워커 (프로세스 내 스레드)
+
+    submit() 은 Future 를 반환하고, 워커 스레드가 첫 요청 후 max_wait 초 동안
+    (또는 max_batch_size 개가 찰 때까지) 요청을 모아 generate_batch 를 1회 호출한다.
+    """
+
+    def __init__(self, model, max_batch_size=8, max_wait=0.05):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stopped = False
+
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.batch_sizes = {}
+        self.latency_counts = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, prompt, context=None):
+        future = Future()
+        if self._stopped:
+            future.set_exception(RuntimeError("추론 워커가 종료되었습니다"))
+            return future
+        self._queue.put((prompt, context, future, time.perf_counter()))
+        return future
+
+    def generate(self, prompt, context=None, timeout=None):
+        """배치 워커를 통해 생성하고 결과를 기다림"""
+        return self.submit(prompt, context).result(timeout=timeout)
+
+    def _collect(self):
+        """첫 요청을 기다린 뒤 마감 시각까지 최대 max_batch_size 개 수집"""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # 종료 신호는 현재 배치 처리 후 반영
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            prompts = [item[0] for item in batch]
+            contexts = [item[1] for item in batch]
+            try:
+                results = generate_batch(self.model, prompts, contexts)
+                error = None
+            except Exception as e:
+                results, error = None, e
+
+            now = time.perf_counter()
+            with self._lock:
+                self.batches += 1
+                self.requests += len(batch)
+                self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+                if error is not None:
+                    self.errors += len(batch)
+                for _, _, _, submitted_at in batch:
+                    latency = now - submitted_at
+                    self.latency_sum += latency
+                    self.latency_counts[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+            for i, (_, _, future, _) in enumerate(batch):
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(results[i])
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self.queue_depth(),
+                "requests": self.requests,
+                "batches": self.batches,
+                "errors": self.errors,
+                "avg_batch_size": self.requests / self.batches if self.batches else 0.0,
+                "avg_latency": self.latency_sum / self.requests if self.requests else 0.0,
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+                "latency_histogram": {
+                    ("+Inf" if math.isinf(bound) else f"{bound:g}s"): count
+                    for bound, count in zip(LATENCY_BUCKETS, self.latency_counts)
+                },
+            }
+
+    def close(self):
+        """대기 중인 요청을 처리하고 워커 종료"""
+        if self._stopped:
+            return
+        self._stopped = True
+        self._queue.put(None)
+        self._thread.join()
@@ -0,0 +1,104 @@
+"""Aho–Corasick 다중 키워드 매칭"""
+from collections import deque
+
+
+class KeywordMatcher:
+    """모든 키워드 테이블을 하나의 오토마톤으로 컴파일해 텍스트를 한 번만 스캔"""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._info = {}
+        self._compiled = False
+
+    def add(self, keyword, category=None, rule_group=None, emergency_weight=0,
+            knowledge_id=None, elderly_warning=False):
+        """키워드 등록 (같은 키워드를 여러 테이블에 등록하면 속성이 합쳐짐)"""
+        keyword = keyword.lower()
+        info = self._info.get(keyword)
+        if info is None:
+            info = self._info[keyword] = {
+                "keyword": keyword,
+                "categories": [],
+                "rule_groups": [],
+                "emergency_weight": 0,
+                "knowledge_id": None,
+                "elderly_warning": False,
+            }
+            self._insert(keyword)
+
+        if category and category not in info["categories"]:
+            info["categories"].append(category)
+        if rule_group and rule_group not in info["rule_groups"]:
+            info["rule_groups"].append(rule_group)
+        info["emergency_weight"] = max(info["emergency_weight"], emergency_weight)
+        if knowledge_id is not None:
+            info["knowledge_id"] = knowledge_id
+        info["elderly_warning"] = info["elderly_warning"] or elderly_warning
+        return self
+
+    def _insert(self, keyword):
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = nxt
+        self._output[state].append(keyword)
+        self._compiled = False
+
+    def compile(self):
+        """실패 링크 계산 (BFS)"""
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                # 실패 링크의 출력도 이 상태에서 매칭됨
+                self._output[nxt] = self._output[nxt] + [
+                    k for k in self._output[self._fail[nxt]] if k not in self._output[nxt]
+                ]
+        self._compiled = True
+        return self
+
+    def scan(self, text):
+        """텍스트 1회 스캔 → {키워드: 속성} (처음 등장한 순서)"""
+        if not self._compiled:
+            self.compile()
+
+        matches = {}
+        state = 0
+        for ch in text.lower():
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for keyword in self._output[state]:
+                if keyword not in matches:
+                    matches[keyword] = self._info[keyword]
+        return matches
+
+    def __len__(self):
+        return len(self._info)
+
+
+def categories_of(matches):
+    """매칭 결과의 카테고리 목록 (중복 제거, 등장 순서 유지)"""
+    return list(dict.fromkeys(c for info in matches.values() for c in info["categories"]))
+
+
+def rule_groups_of(matches):
+    return {g for info in matches.values() for g in info["rule_groups"]}
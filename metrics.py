@@ -0,0 +1,362 @@
+"""파이프라인 계측 (구간 span, 카운터) 및 내보내기
+
+- span(name, **labels): with 블록 구간 시간을 히스토그램에 누적하고 최근 span 을 보관한다.
+  안에서 열린 span 은 자식으로 연결된다 (contextvars 기반이므로 asyncio 태스크에도 전파).
+- incr(name, **labels): 카운터 증가 (폴백, 캐시 적중 등)
+- METRICS.add_listener(callback): 끝난 span 을 외부 수집기로 전달
+- 내보내기: Prometheus 텍스트 형식 / OpenTelemetry OTLP JSON 형식
+  PETDOCTOR_METRICS_PORT 를 지정하면 HTTP /metrics (/metrics.json) 를 PETDOCTOR_METRICS_HOST(기본 127.0.0.1)에서,
+  PETDOCTOR_METRICS_FILE 을 지정하면 PETDOCTOR_METRICS_INTERVAL 초마다 파일로 기록한다.
+"""
+import contextlib
+import contextvars
+import json
+import math
+import os
+import re
+import secrets
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SERVICE_NAME = "petdoctor"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+
+_current_span = contextvars.ContextVar("petdoctor_span", default=None)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def percentile(values, q):
+    """측정값 목록의 분위수 (최근접 순위, 벤치마크/일괄 실행 통계용)"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def bucket_quantile(buckets, counts, q):
+    """히스토그램 버킷으로 추정한 분위수 (해당 버킷 상한)"""
+    total = sum(counts)
+    if not total:
+        return 0.0
+    target = q * total
+    cumulative = 0
+    for bound, count in zip(buckets, counts):
+        cumulative += count
+        if cumulative >= target:
+            return bound if bound != math.inf else buckets[-2]
+    return buckets[-2]
+
+
+class Metrics:
+    """스레드 안전 카운터/히스토그램 + 최근 span 버퍼"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, max_spans=1000):
+        self.buckets = buckets
+        self.started_at = time.time_ns()
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._spans = deque(maxlen=max_spans)
+        self._listeners = []
+
+    def incr(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"counts": [0] * len(self.buckets), "sum": 0.0}
+            histogram["counts"][next(i for i, b in enumerate(self.buckets) if seconds <= b)] += 1
+            histogram["sum"] += seconds
+
+    @contextlib.contextmanager
+    def span(self, name, **labels):
+        """구간 측정 (예외가 나면 status=error 로 기록하고 다시 발생)"""
+        parent = _current_span.get()
+        record = {
+            "name": name,
+            "labels": labels,
+            "trace_id": parent["trace_id"] if parent else secrets.token_hex(16),
+            "span_id": secrets.token_hex(8),
+            "parent_id": parent["span_id"] if parent else None,
+            "start_ns": time.time_ns(),
+            "status": "ok",
+        }
+        token = _current_span.set(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record["status"] = "error"
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            record["duration"] = time.perf_counter() - start
+            record["end_ns"] = record["start_ns"] + int(record["duration"] * 1e9)
+            self._finish(record)
+
+    def _finish(self, record):
+        self.observe(f"{record['name']}_seconds", record["duration"], **record["labels"])
+        if record["status"] == "error":
+            self.incr(f"{record['name']}_errors", **record["labels"])
+        with self._lock:
+            self._spans.append(record)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(record)
+            except Exception as e:
+                print(f"계측 리스너 오류: {e}")
+
+    def add_listener(self, callback):
+        """끝난 span 마다 callback(record) 호출"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            self._listeners.remove(callback)
+
+    def counters(self):
+        """[(이름, 라벨 dict, 값)]"""
+        with self._lock:
+            return [(name, dict(labels), value) for (name, labels), value in sorted(self._counters.items())]
+
+    def histograms(self):
+        """[(이름, 라벨 dict, 버킷별 개수, 합계)]"""
+        with self._lock:
+            return [
+                (name, dict(labels), list(h["counts"]), h["sum"])
+                for (name, labels), h in sorted(self._histograms.items())
+            ]
+
+    def recent_spans(self, limit=None):
+        with self._lock:
+            spans = list(self._spans)
+        return spans[-limit:] if limit else spans
+
+    def summary(self):
+        """히스토그램별 건수/평균/추정 p50·p95·p99 (관리 화면용)"""
+        rows = []
+        for name, labels, counts, total in self.histograms():
+            count = sum(counts)
+            rows.append({
+                "metric": name,
+                **labels,
+                "count": count,
+                "mean": total / count if count else 0.0,
+                "p50": bucket_quantile(self.buckets, counts, 0.50),
+                "p95": bucket_quantile(self.buckets, counts, 0.95),
+                "p99": bucket_quantile(self.buckets, counts, 0.99),
+            })
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._spans.clear()
+            self.started_at = time.time_ns()
+
+
+# 프로세스 공용 레지스트리
+METRICS = Metrics()
+span = METRICS.span
+incr = METRICS.incr
+
+
+def _metric_name(name):
+    return f"{SERVICE_NAME}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prometheus_labels(labels, **extra):
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def prometheus_text(metrics=METRICS):
+    """Prometheus 텍스트 노출 형식"""
+    lines = []
+    typed = set()
+    for name, labels, value in metrics.counters():
+        metric = _metric_name(name) + "_total"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{_prometheus_labels(labels)} {value}")
+    for name, labels, counts, total in metrics.histograms():
+        metric = _metric_name(name)
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} histogram")
+            typed.add(metric)
+        cumulative = 0
+        for bound, count in zip(metrics.buckets, counts):
+            cumulative += count
+            le = "+Inf" if bound == math.inf else repr(bound)
+            lines.append(f"{metric}_bucket{_prometheus_labels(labels, le=le)} {cumulative}")
+        lines.append(f"{metric}_sum{_prometheus_labels(labels)} {total}")
+        lines.append(f"{metric}_count{_prometheus_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def _otlp_attributes(labels):
+    return [{"key": k, "value": {"stringValue": str(v)}} for k, v in labels.items()]
+
+
+def _otlp_resource():
+    return {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})}
+
+
+def otlp_metrics(metrics=METRICS):
+    """OTLP JSON 메트릭 (ExportMetricsServiceRequest 형식, 누적 집계)"""
+    now = str(time.time_ns())
+    start = str(metrics.started_at)
+    by_name = {}
+    for name, labels, value in metrics.counters():
+        metric = by_name.setdefault(_metric_name(name), {
+            "name": _metric_name(name),
+            "sum": {"dataPoints": [], "aggregationTemporality": 2, "isMonotonic": True},
+        })
+        metric["sum"]["dataPoints"].append({
+            "attributes": _otlp_attributes(labels),
+            "startTimeUnixNano": start,
+            "timeUnixNano": now,
+            "asInt": str(value),
+        })
+    for name, labels, counts, total in metrics.histograms():
+        metric = by_name.setdefault(_metric_name(name), {
+            "name": _metric_name(name),
+            "unit": "s",
+            "histogram": {"dataPoints": [], "aggregationTemporality": 2},
+        })
+        metric["histogram"]["dataPoints"].append({
+            "attributes": _otlp_attributes(labels),
+            "startTimeUnixNano": start,
+            "timeUnixNano": now,
+            "count": str(sum(counts)),
+            "sum": total,
+            "bucketCounts": [str(c) for c in counts],
+            "explicitBounds": [b for b in metrics.buckets if b != math.inf],
+        })
+    return {"resourceMetrics": [{
+        "resource": _otlp_resource(),
+        "scopeMetrics": [{"scope": {"name": SERVICE_NAME}, "metrics": list(by_name.values())}],
+    }]}
+
+
+def otlp_traces(metrics=METRICS, limit=None):
+    """OTLP JSON 트레이스 (ExportTraceServiceRequest 형식, 최근 span)"""
+    spans = []
+    for record in metrics.recent_spans(limit):
+        status = {"code": 1}
+        if record["status"] == "error":
+            status = {"code": 2, "message": record.get("error", "")}
+        spans.append({
+            "traceId": record["trace_id"],
+            "spanId": record["span_id"],
+            "parentSpanId": record["parent_id"] or "",
+            "name": record["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(record["start_ns"]),
+            "endTimeUnixNano": str(record["end_ns"]),
+            "attributes": _otlp_attributes(record["labels"]),
+            "status": status,
+        })
+    return {"resourceSpans": [{
+        "resource": _otlp_resource(),
+        "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": spans}],
+    }]}
+
+
+def otlp_json(metrics=METRICS):
+    """메트릭 + 트레이스 OTLP JSON 문자열"""
+    return json.dumps({**otlp_metrics(metrics), **otlp_traces(metrics)}, ensure_ascii=False)
+
+
+def write_metrics_file(path, file_format="prometheus", metrics=METRICS):
+    """메트릭 파일 기록 (임시 파일 후 교체 - 수집기가 쓰는 중인 파일을 읽지 않도록)"""
+    content = otlp_json(metrics) if file_format == "otlp" else prometheus_text(metrics)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = prometheus_text(), "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path == "/metrics.json":
+            body, content_type = otlp_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters(host=None):
+    """환경 변수에 따라 HTTP 엔드포인트/파일 내보내기 시작 (프로세스당 1회, 실행 진입점에서 호출)
+
+    HTTP 엔드포인트는 기본적으로 로컬에서만 접근 가능하다.
+    외부 수집기에 노출하려면 host 또는 PETDOCTOR_METRICS_HOST 를 명시한다 (예: 0.0.0.0).
+    """
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    port = os.environ.get("PETDOCTOR_METRICS_PORT")
+    if port:
+        host = host or os.environ.get("PETDOCTOR_METRICS_HOST", "127.0.0.1")
+        try:
+            server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+        except OSError as e:
+            # 같은 포트를 이미 다른 프로세스가 사용 중 (멀티 프로세스 실행 등)
+            print(f"메트릭 엔드포인트 시작 실패: {e}")
+        else:
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+            print(f"메트릭 엔드포인트: http://{host}:{port}/metrics")
+
+    path = os.environ.get("PETDOCTOR_METRICS_FILE")
+    if path:
+        file_format = os.environ.get("PETDOCTOR_METRICS_FORMAT", "prometheus")
+        interval = float(os.environ.get("PETDOCTOR_METRICS_INTERVAL", "15"))
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    write_metrics_file(path, file_format)
+                except OSError as e:
+                    print(f"메트릭 파일 기록 오류: {e}")
+
+        threading.Thread(target=run, name="metrics-file", daemon=True).start()
@@ -0,0 +1,113 @@
+"""파인튜닝 모델 CPU 추론 백엔드 (fp32 / torch 동적 int8 / ONNX Runtime)"""
+import inspect
+import multiprocessing
+import os
+
+from inference import generate_batch
+
+INFERENCE_BACKENDS = ("fp32", "int8", "onnx")
+
+
+def _onnx_dir(model_path):
+    return os.path.normpath(model_path) + "-onnx"
+
+
+def _export_onnx(model_path, onnx_dir):
+    from optimum.onnxruntime import ORTModelForCausalLM
+
+    ORTModelForCausalLM.from_pretrained(model_path, export=True).save_pretrained(onnx_dir)
+
+
+def _load_onnx(model_path, onnx_dir=None):
+    """ONNX Runtime 그래프 로드 (없으면 한 번 내보내서 모델 옆에 저장)
+
+    내보내기는 fp32 가중치를 올려야 하므로 별도 프로세스에서 실행한다.
+    optimum[onnxruntime] 필요
+    """
+    from optimum.onnxruntime import ORTModelForCausalLM
+
+    onnx_dir = onnx_dir or _onnx_dir(model_path)
+    if not os.path.isdir(onnx_dir):
+        process = multiprocessing.get_context("spawn").Process(target=_export_onnx, args=(model_path, onnx_dir))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            raise RuntimeError(f"ONNX 그래프 내보내기 실패: {model_path}")
+        print(f"ONNX 그래프 내보내기 완료: {onnx_dir}")
+    return ORTModelForCausalLM.from_pretrained(onnx_dir)
+
+
+def finetuned_prompt_format():
+    """파인튜닝 프롬프트 템플릿 함수 format_prompt(prompt, context=None) (없으면 None)
+
+    인스턴스 없이 호출할 수 있어야 하므로 models.finetuned_model 의 모듈 수준 함수
+    또는 FinetunedModel 의 staticmethod 만 인정한다.
+    """
+    import models.finetuned_model as finetuned
+
+    if callable(getattr(finetuned, "format_prompt", None)):
+        return finetuned.format_prompt
+    model_class = getattr(finetuned, "FinetunedModel", None)
+    if isinstance(inspect.getattr_static(model_class, "format_prompt", None), staticmethod):
+        return model_class.format_prompt
+    return None
+
+
+class OnnxFinetunedModel:
+    """ONNX Runtime 그래프 + 토크나이저 래퍼 (fp32 PyTorch 모델을 만들지 않음)
+
+    프롬프트 템플릿은 인스턴스 상태와 무관한 함수로 넘겨받는다 (파인튜닝 템플릿을 추측하지 않음).
+    """
+
+    def __init__(self, model_path, prompt_format, onnx_dir=None):
+        from transformers import AutoTokenizer
+
+        self.model_path = model_path
+        self.prompt_format = prompt_format
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.model = _load_onnx(model_path, onnx_dir)
+        self.generation_kwargs = None
+
+    def format_prompt(self, prompt, context=None):
+        return self.prompt_format(prompt, context=context)
+
+    def generate_response(self, prompt, context=None):
+        return generate_batch(self, [prompt], [context])[0]
+
+
+def load_finetuned_model(model_path=None, backend="fp32", onnx_dir=None, prompt_format=None):
+    """백엔드를 적용한 파인튜닝 모델 래퍼 생성
+
+    int8 은 래퍼가 transformers 모델을 .model 로 노출해야 하고,
+    onnx 는 fp32 모델 없이 ONNX 그래프만 로드하며 프롬프트 템플릿 함수가 필요하다
+    (prompt_format 으로 직접 넘기거나 finetuned_prompt_format 규약을 따름).
+    """
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"지원하지 않는 추론 백엔드: {backend} ({', '.join(INFERENCE_BACKENDS)})")
+
+    if backend == "onnx":
+        prompt_format = prompt_format or finetuned_prompt_format()
+        if prompt_format is None:
+            raise ValueError(
+                "onnx 백엔드는 프롬프트 템플릿 함수가 필요합니다 "
+                "(models.finetuned_model.format_prompt 또는 FinetunedModel.format_prompt staticmethod)"
+            )
+        return OnnxFinetunedModel(model_path or "models/finetuned_model", prompt_format, onnx_dir)
+
+    # 실제 모델 패키지는 모델을 로드할 때만 필요 (대체 모델로 파이프라인만 실행하는 경우 제외)
+    from models.finetuned_model import FinetunedModel
+
+    model = FinetunedModel(model_path=model_path)
+    if backend == "fp32":
+        return model
+
+    hf_model = getattr(model, "model", None)
+    if hf_model is None or not hasattr(hf_model, "generate"):
+        raise ValueError(f"{backend} 백엔드는 transformers 모델을 노출하는 래퍼에서만 사용할 수 있습니다")
+
+    # int8: fp32 로드 후 Linear 층만 제자리 양자화 (fp32 가중치는 교체되며 해제됨)
+    import torch
+
+    hf_model.eval()
+    torch.quantization.quantize_dynamic(hf_model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
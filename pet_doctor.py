@@ -0,0 +1,974 @@
+"""AI 펫닥터 상담 파이프라인 (LangGraph)
+
+Streamlit 화면(app4.py)과 일괄 실행 CLI(batch_consult.py)가 함께 사용한다.
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, Dict, List, TypedDict
+
+import pandas as pd
+from langgraph.graph import StateGraph, END
+
+# 파인튜닝된 모델 임포트
+from model_backends import load_finetuned_model
+from caching import ResponseCache, TTLCache, normalize_text, response_cache_key
+from consultation_writer import ConsultationWriter
+from db import DB_PATH, get_pool
+from schema import fulltext_search_available, migrate, reset_schema
+from supplement_index import SupplementIndex
+from supplement_ranking import SupplementRanker
+from embedding_pipeline import embeddings_from_env
+from inference import InferenceBatcher, stream_generate, supports_batching
+from keyword_matcher import KeywordMatcher, categories_of, rule_groups_of
+from metrics import incr, span
+from rag_store import KNOWLEDGE_DIR, get_documents, load_documents, load_or_build_vectorstore, search_ids_by_vector
+
+# LangGraph 상태 정의
+def merge_timings(left: Dict[str, float], right: Dict[str, float]) -> Dict[str, float]:
+    """병렬 노드의 처리 시간 병합"""
+    return {**(left or {}), **(right or {})}
+
+class GraphState(TypedDict):
+    pet_info: dict
+    symptoms: str
+    health_analysis: str
+    supplement_recommendations: List[dict]
+    consultation_id: str
+    keyword_matches: dict
+    emergency_level: int
+    medical_context: str
+    supplement_categories: List[str]
+    supplement_candidates: List[tuple]
+    symptom_vector: List[float]
+    node_timings: Annotated[Dict[str, float], merge_timings]
+
+def new_consultation_state(pet_info, symptoms):
+    """상담 그래프 입력 상태"""
+    return {
+        "pet_info": pet_info,
+        "symptoms": symptoms,
+        "health_analysis": "",
+        "supplement_recommendations": [],
+        "consultation_id": ""
+    }
+
+def utc_day_start(day):
+    """로컬 날짜 00:00 → timestamp 컬럼과 같은 UTC 문자열 (CURRENT_TIMESTAMP 형식)"""
+    local_midnight = datetime.combine(day, datetime.min.time()).astimezone()
+    return local_midnight.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+# 영양제 추천 생성시 시스템 프롬프트
+SUPPLEMENT_SYSTEM_PROMPT = "당신은 반려동물 영양학 전문가입니다. 안전하고 효과적인 영양제를 추천해주세요."
+
+class BasicLLMPetDoctor:
+    def __init__(self, model_path=None, inference_backend="fp32", db_path=DB_PATH, model=None):
+        self.model_path = model_path
+        self.inference_backend = inference_backend
+        # 미리 만든 모델 객체 (벤치마크용 대체 모델 등, 없으면 model_path 에서 로드)
+        self.preloaded_model = model
+        
+        # LLM 응답 디스크 캐시 (PETDOCTOR_LLM_CACHE=0 이면 사용 안 함)
+        self.response_cache = None
+        if os.environ.get("PETDOCTOR_LLM_CACHE", "1") != "0":
+            self.response_cache = ResponseCache(
+                ttl=float(os.environ.get("PETDOCTOR_LLM_CACHE_TTL", str(7 * 24 * 3600))),
+                max_entries=int(os.environ.get("PETDOCTOR_LLM_CACHE_SIZE", "10000")),
+            )
+        
+        # 공유 커넥션 풀 (WAL 모드)
+        self.db = get_pool(db_path)
+        
+        self.setup_database()
+        
+        # 상담 기록 write-behind 큐 (ID 선할당 + 배치 저장)
+        self.consultation_writer = ConsultationWriter(
+            self.db,
+            batch_size=int(os.environ.get("PETDOCTOR_WRITE_BATCH_SIZE", "50")),
+            flush_interval=float(os.environ.get("PETDOCTOR_WRITE_FLUSH_INTERVAL", "1.0")),
+        )
+        
+        # 쿼리 임베딩/검색 결과 캐시 (정규화된 증상 텍스트 기준)
+        self.query_cache = TTLCache(
+            maxsize=int(os.environ.get("PETDOCTOR_QUERY_CACHE_SIZE", "1024")),
+            ttl=float(os.environ.get("PETDOCTOR_QUERY_CACHE_TTL", "3600")),
+        )
+        
+        # 비동기 그래프 실행용 이벤트 루프 (별도 스레드) + 블로킹 작업 실행기
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get("PETDOCTOR_ASYNC_WORKERS", "16")),
+            thread_name_prefix="pipeline",
+        )
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(self.executor)
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, name="pipeline-loop", daemon=True)
+        self.loop_thread.start()
+        self.closed = False
+        
+        self.setup_prompts()
+        self.setup_keyword_matcher()
+        self.setup_langgraph()
+        
+        # 모델/임베딩/벡터 인덱스는 백그라운드에서 로드 (화면은 바로 표시, 상담은 준비될 때까지 대기)
+        self.finetuned_model = None
+        self.inference_batcher = None
+        self.embeddings = None
+        self.vectorstore = None
+        self.supplement_index = None
+        self.supplement_ranker = None
+        self.ready = Future()
+        self.load_started_at = time.perf_counter()
+        self.load_seconds = None
+        threading.Thread(target=self.load_components, name="model-loader", daemon=True).start()
+        
+    def load_components(self):
+        """무거운 구성 요소 로드 후 ready Future 완료"""
+        try:
+            self.setup_model()
+            self.setup_rag_system()
+            
+            # 영양제 추천 순위 (카탈로그 메모리 캐시 + 영양제 임베딩 의미 매칭)
+            self.supplement_ranker = SupplementRanker(self.db, self.supplement_index)
+        except Exception as e:
+            print(f"모델 로드 실패: {e}")
+            self.ready.set_exception(e)
+            return
+        self.load_seconds = time.perf_counter() - self.load_started_at
+        print(f"모델/지식베이스 로드 완료: {self.load_seconds:.1f}초")
+        self.ready.set_result(True)
+    
+    def close(self):
+        """이벤트 루프/실행기/배치 워커를 종료하고 남은 상담 기록 저장"""
+        if self.closed:
+            return
+        self.closed = True
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join()
+        self.loop.close()
+        self.executor.shutdown(wait=True)
+        if self.inference_batcher is not None:
+            self.inference_batcher.close()
+        self.consultation_writer.close()
+        if hasattr(self.embeddings, "close"):
+            self.embeddings.close()
+    
+    def wait_ready(self, timeout=None):
+        """로드 완료까지 대기 (로드 실패시 예외)"""
+        return self.ready.result(timeout=timeout)
+    
+    def load_status(self):
+        """(상태, 경과 시간 또는 오류) - 상태는 loading / ready / error"""
+        if not self.ready.done():
+            return "loading", time.perf_counter() - self.load_started_at
+        if self.ready.exception() is not None:
+            return "error", self.ready.exception()
+        return "ready", self.load_seconds
+    
+    def setup_model(self):
+        """파인튜닝된 모델 초기화 (fp32 / int8 / onnx)"""
+        self.finetuned_model = self.preloaded_model or load_finetuned_model(self.model_path, self.inference_backend)
+        
+        # 동시 요청 배치 추론 워커 (PETDOCTOR_INFERENCE_BATCH_SIZE=1 이면 요청별 직접 생성)
+        # 래퍼가 배치 생성을 지원하지 않으면 워커는 요청을 직렬화할 뿐이므로 사용하지 않음
+        batch_size = int(os.environ.get("PETDOCTOR_INFERENCE_BATCH_SIZE", "8"))
+        if batch_size > 1 and supports_batching(self.finetuned_model):
+            self.inference_batcher = InferenceBatcher(
+                self.finetuned_model,
+                max_batch_size=batch_size,
+                max_wait=float(os.environ.get("PETDOCTOR_INFERENCE_BATCH_WAIT", "0.05")),
+            )
+        
+    def setup_database(self):
+        """데이터베이스 설정 (스키마가 최신이면 버전 확인만 수행)"""
+        applied = migrate(self.db)
+        if applied:
+            print(f"DB 마이그레이션 적용: {applied}")
+        self.fts_enabled = fulltext_search_available(self.db)
+    
+    def setup_prompts(self):
+        """전문가 수준의 프롬프트 템플릿 설정"""
+        
+        self.symptom_analysis_prompt = """
+당신은 경험이 풍부한 수의사입니다. 반려동물의 증상을 분석하여 가능한 건강 문제를 평가해주세요.
+
+**반려동물 정보:**
+- 이름: {pet_name}
+- 종류: {pet_type}
+- 나이: {pet_age}세
+- 체중: {pet_weight}kg
+
+**증상:**
+{symptoms}
+
+**관련 의학 지식:**
+{medical_context}
+
+다음 형식으로 분석해주세요:
+
+**🔍 주요 증상 분석:**
+- 관찰된 증상들의 의학적 의미
+- 증상의 심각도 평가
+
+**🏥 가능한 진단:**
+1. 가장 가능성 높은 질환 (확률 포함)
+2. 고려해야 할 다른 질환들
+
+**⚠️ 주의사항:**
+- 응급상황 여부
+- 수의사 진료 필요성
+- 관찰해야 할 추가 증상
+
+**📋 추천 조치:**
+- 즉시 취할 수 있는 응급처치
+- 일상 관리 방법
+- 영양 보충 필요성
+
+정확한 진단을 위해서는 반드시 전문 수의사의 진료를 받으시기 바랍니다.
+"""
+
+        self.supplement_recommendation_prompt = """
+당신은 반려동물 영양학 전문가입니다. 분석된 건강 상태를 바탕으로 적절한 영양제를 추천해주세요.
+
+**건강 분석 결과:**
+{health_analysis}
+
+**반려동물 정보:**
+- 종류: {pet_type}
+- 나이: {pet_age}세  
+- 체중: {pet_weight}kg
+
+**사용 가능한 영양제:**
+{available_supplements}
+
+다음 기준으로 영양제를 추천해주세요:
+
+**추천 기준:**
+1. 증상과의 연관성
+2. 반려동물의 나이/체중 적합성
+3. 안전성 및 부작용
+4. 다른 영양제와의 상호작용
+5. 비용 대비 효과
+
+**추천 형식:**
+각 영양제별로:
+- 추천 이유 (의학적 근거)
+- 예상 효과
+- 복용법 및 주의사항
+- 다른 영양제와 병용 가능성
+- 효과를 보기까지 예상 기간
+
+**중요:** 
+- 최대 3개까지만 추천
+- 반려동물의 현재 상태에 가장 적합한 것부터 우선순위 부여
+- 부작용이나 금기사항이 있다면 반드시 언급
+"""
+
+        self.emergency_assessment_prompt = """
+다음 증상들이 응급상황에 해당하는지 평가해주세요:
+
+증상: {symptoms}
+반려동물: {pet_type}, {pet_age}세
+
+응급도를 1-5단계로 평가하고 이유를 설명해주세요:
+1 = 일상 관찰, 2 = 며칠 내 병원, 3 = 1-2일 내 병원, 4 = 당일 병원, 5 = 즉시 응급실
+
+평가 결과와 근거를 제시해주세요.
+"""
+
+    def setup_keyword_matcher(self):
+        """키워드 테이블을 하나의 Aho–Corasick 오토마톤으로 컴파일"""
+        
+        # 응급 키워드 (응급도 가중치)
+        emergency_keywords = [
+            "의식을 잃", "경련", "호흡곤란", "숨을 못", "피를 토", "복부팽만", 
+            "고열", "41도", "창백", "잇몸이 하얗", "지속적 구토", "심한 설사"
+        ]
+        
+        # 고령 동물에서 주의해야 할 증상
+        elderly_warning_keywords = ["숨가쁨", "기침", "식욕없음"]
+        
+        # 키워드 매칭 RAG 대체용 지식
+        self.knowledge_map = {
+            "절뚝": "개의 관절염은 연골의 퇴행성 변화로 발생하며, 주요 증상으로는 절뚝거림, 계단 오르내리기 거부, 활동량 감소가 있습니다.",
+            "관절": "관절 문제는 글루코사민과 콘드로이틴 보충이 도움되며, 체중 관리와 적절한 운동이 중요합니다.",
+            "구토": "급성 위장염은 구토, 설사, 식욕부진을 주요 증상으로 합니다. 금식 후 점진적 식이 재개가 필요합니다.",
+            "설사": "설사는 식이 변화, 스트레스, 세균 감염 등이 원인이 될 수 있습니다. 프로바이오틱 보충이 도움됩니다.",
+            "가려움": "아토피 피부염은 가려움, 발진, 털빠짐을 주요 증상으로 하며, 오메가3 지방산 보충이 효과적입니다.",
+            "털빠짐": "털빠짐은 영양 불균형이나 알레르기가 원인일 수 있으며, 오메가3 보충이 도움됩니다.",
+        }
+        
+        # 규칙 기반 분석 그룹 ("주요증상"이 하나도 없으면 일반 건강 관리 안내)
+        rule_groups = {
+            "관절": ["절뚝", "다리", "관절", "계단"],
+            "소화기": ["구토", "토", "설사", "소화", "식욕"],
+            "피부": ["가려움", "긁", "털빠짐", "발진", "피부"],
+            "주요증상": ["절뚝", "구토", "가려움", "설사"],
+        }
+        
+        # 증상별 영양제 카테고리 매핑
+        category_mapping = {
+            "관절": "관절건강",
+            "소화": "소화기건강", 
+            "피부": "피부모질",
+            "면역": "면역강화",
+            "심장": "심장건강",
+            "간": "간기능",
+            "방광": "비뇨기건강"
+        }
+        
+        matcher = KeywordMatcher()
+        for keyword in emergency_keywords:
+            matcher.add(keyword, emergency_weight=4)
+        for keyword in elderly_warning_keywords:
+            matcher.add(keyword, elderly_warning=True)
+        for keyword in self.knowledge_map:
+            matcher.add(keyword, knowledge_id=keyword)
+        for group, keywords in rule_groups.items():
+            for keyword in keywords:
+                matcher.add(keyword, rule_group=group)
+        for keyword, category in category_mapping.items():
+            matcher.add(keyword, category=category)
+        
+        self.keyword_matcher = matcher.compile()
+
+    def match_keywords(self, state: GraphState):
+        """증상 키워드 매칭 결과 (emergency_check 에서 1회 스캔 후 상태로 공유)"""
+        matches = state.get("keyword_matches")
+        if matches is None:
+            matches = self.keyword_matcher.scan(state["symptoms"])
+        return matches
+
+    def setup_rag_system(self):
+        """RAG 시스템 설정 - 더 풍부한 지식베이스"""
+        
+        # 수의학 지식베이스: knowledge_base/ 디렉터리의 md/txt/jsonl 문서
+        documents = load_documents(KNOWLEDGE_DIR)
+        knowledge_base = [doc.page_content for doc in documents]
+        
+        # 임베딩 및 벡터스토어 생성 (변경된 청크만 증분 임베딩)
+        self.embeddings = None
+        try:
+            # OpenAI 임베딩 사용 (API 키 필요)
+            embeddings = OpenAIEmbeddings()
+            self.vectorstore = load_or_build_vectorstore(documents, embeddings, "openai")
+            self.embeddings = embeddings
+        except:
+            try:
+                # 무료 HuggingFace 임베딩 사용 (대안) - 배치/멀티코어 빌드, 백엔드는 환경 변수로 선택
+                embeddings = embeddings_from_env()
+                self.vectorstore = load_or_build_vectorstore(documents, embeddings, embeddings.model_id)
+                self.embeddings = embeddings
+            except:
+                # 임베딩 없이 키워드 매칭으로 대체
+                self.vectorstore = None
+                self.knowledge_base_text = " ".join(knowledge_base)
+        
+        # 영양제 설명 임베딩 인덱스 (지식 검색과 같은 모델, 증상 벡터 재사용)
+        if self.embeddings is not None:
+            self.supplement_index = SupplementIndex(self.embeddings, getattr(self.embeddings, "model_id", "openai"))
+
+    def setup_langgraph(self):
+        """LangGraph 워크플로우 설정 (ainvoke 전용)
+        
+        LLM 노드는 비동기 메서드로, 배치 워커 결과를 스레드 없이 기다린다.
+        나머지 동기 노드와 블로킹 호출(SQLite, 임베딩, 직접/스트리밍 생성)만 실행기 스레드에서 실행한다.
+        """
+        workflow = StateGraph(GraphState)
+        
+        # 노드 추가 (노드별 처리 시간 기록)
+        nodes = {
+            "emergency_check": self.emergency_check,
+            "embed_symptoms": self.embed_symptoms,
+            "retrieve_context": self.retrieve_context,
+            "select_supplements": self.select_supplements,
+            "analyze_symptoms": self.analyze_symptoms,
+            "recommend_supplements": self.recommend_supplements,
+            "save_consultation": self.save_consultation,
+        }
+        for name, node in nodes.items():
+            if not asyncio.iscoroutinefunction(node):
+                node = self.offloaded(node)
+            workflow.add_node(name, self.timed_node(name, node))
+        
+        # 엣지 설정
+        # 응급상황이 아니면 증상을 한 번 임베딩한 뒤 지식 검색과 영양제 후보 조회를 병렬로 실행하고,
+        # 증상 분석과 후보 조회가 모두 끝나면 최종 영양제 추천
+        workflow.set_entry_point("emergency_check")
+        workflow.add_conditional_edges("emergency_check", self.route_after_emergency)
+        workflow.add_edge("embed_symptoms", "retrieve_context")
+        workflow.add_edge("embed_symptoms", "select_supplements")
+        workflow.add_edge("retrieve_context", "analyze_symptoms")
+        workflow.add_edge(["analyze_symptoms", "select_supplements"], "recommend_supplements")
+        workflow.add_edge("recommend_supplements", "save_consultation")
+        workflow.add_edge("save_consultation", END)
+        
+        self.app = workflow.compile()
+
+    def timed_node(self, name, node):
+        """노드 실행 시간을 node_timings 에 기록하는 래퍼"""
+        async def run(state: GraphState, config=None):
+            start = time.perf_counter()
+            with span("node", node=name):
+                update = dict(await node(state, config) or {})
+            update["node_timings"] = {name: time.perf_counter() - start}
+            return update
+        return run
+
+    async def run_blocking(self, func, *args):
+        """블로킹 함수를 실행기 스레드에서 실행 (현재 span 이 이어지도록 컨텍스트 복사)"""
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(context.run, func, *args)
+        )
+
+    def offloaded(self, node):
+        """동기 노드를 실행기에서 실행하는 비동기 노드로 변환"""
+        async def run(state: GraphState, config=None):
+            return await self.run_blocking(node, state, config)
+        return run
+
+    def run_async(self, coro):
+        """파이프라인 이벤트 루프에서 코루틴 실행 (concurrent.futures.Future 반환)"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def route_after_emergency(self, state: GraphState):
+        """응급상황이면 바로 저장, 아니면 증상 임베딩 후 병렬 분기"""
+        if state.get("emergency_level", 0) >= 4:
+            return "save_consultation"
+        return "embed_symptoms"
+
+    def emergency_check(self, state: GraphState, config=None) -> dict:
+        """응급상황 체크"""
+        pet_info = state["pet_info"]
+        matches = self.match_keywords(state)
+        
+        emergency_level = 0
+        emergency_reasons = []
+        
+        for keyword, info in matches.items():
+            if info["emergency_weight"]:
+                emergency_level = max(emergency_level, info["emergency_weight"])
+                emergency_reasons.append(f"'{keyword}' 증상 발견")
+        
+        # 나이 고려
+        if pet_info['age'] > 10 and any(info["elderly_warning"] for info in matches.values()):
+            emergency_level = max(emergency_level, 3)
+            emergency_reasons.append("고령 + 심각한 증상")
+        
+        update = {"keyword_matches": matches, "emergency_level": emergency_level}
+        
+        if emergency_level >= 4:
+            update["supplement_recommendations"] = []
+            update["health_analysis"] = f"""
+🚨 **응급상황 의심** 🚨
+
+**응급도: {emergency_level}/5**
+
+**응급 의심 근거:**
+{chr(10).join(f"• {reason}" for reason in emergency_reasons)}
+
+**즉시 조치:**
+1. 가까운 24시간 동물병원 응급실로 즉시 이동
+2. 이동 중 반려동물을 따뜻하게 유지
+3. 구토물이 기도로 들어가지 않도록 주의
+4. 병원에 미리 전화하여 상황 설명
+
+**⚠️ 중요: 영양제 추천보다 응급 처치가 우선입니다!**
+"""
+        
+        return update
+
+    def model_cache_id(self):
+        """응답 캐시 키용 모델 식별자 (경로 + 버전 + 모델 파일 수정 시각 + 추론 백엔드)"""
+        version = getattr(self.finetuned_model, "version", "")
+        try:
+            mtime = os.path.getmtime(self.model_path) if self.model_path else 0
+        except OSError:
+            mtime = 0
+        return f"{self.model_path}:{version}:{mtime}:{self.inference_backend}"
+
+    async def generate(self, prompt, context, node, config=None):
+        """모델 응답 생성 (token_sink 가 설정되면 토큰을 스트리밍으로 전달)
+        
+        같은 모델/프롬프트/컨텍스트/생성 파라미터의 응답은 캐시에서 반환하며,
+        configurable.bypass_cache 가 참이면 캐시를 건너뛰고 새로 생성한다.
+        배치 워커를 쓰는 동안에는 실행기 스레드를 점유하지 않는다.
+        """
+        configurable = (config or {}).get("configurable") or {}
+        token_sink = configurable.get("token_sink")
+        
+        cache, key = self.response_cache_entry(prompt, context, configurable)
+        if cache is not None:
+            cached = await self.run_blocking(cache.get, key)
+            incr("cache_requests", cache="response", result="miss" if cached is None else "hit")
+            if cached is not None:
+                if token_sink is not None:
+                    token_sink(node, cached)
+                return cached
+        
+        if token_sink is None and self.inference_batcher is not None:
+            with span("model_call", node=node, mode="batch"):
+                response = await asyncio.wrap_future(self.inference_batcher.submit(prompt, context))
+        else:
+            with span("model_call", node=node, mode="direct" if token_sink is None else "stream"):
+                response = await self.run_blocking(self.generate_uncached, prompt, context, node, token_sink)
+        
+        if cache is not None and response:
+            await self.run_blocking(cache.set, key, response)
+        return response
+
+    def response_cache_entry(self, prompt, context, configurable):
+        """(응답 캐시, 키) - 캐시를 쓰지 않으면 (None, None)"""
+        if configurable.get("bypass_cache") or self.response_cache is None:
+            return None, None
+        key = response_cache_key(
+            self.model_cache_id(), prompt, context,
+            getattr(self.finetuned_model, "generation_kwargs", None),
+        )
+        return self.response_cache, key
+
+    def generate_uncached(self, prompt, context, node, token_sink=None):
+        """모델 직접 호출 (token_sink 가 있으면 스트리밍)"""
+        if token_sink is None:
+            return self.finetuned_model.generate_response(prompt, context=context)
+        
+        chunks = []
+        for token in stream_generate(self.finetuned_model, prompt, context=context):
+            chunks.append(token)
+            token_sink(node, token)
+        return "".join(chunks)
+
+    async def aconsult(self, initial_state, bypass_cache=False, token_sink=None, persist=True):
+        """비동기 상담 실행 (모델 준비될 때까지 대기, persist=False 면 상담 이력에 저장하지 않음)"""
+        await asyncio.wrap_future(self.ready)
+        configurable = {"bypass_cache": bypass_cache, "persist": persist}
+        if token_sink is not None:
+            configurable["token_sink"] = token_sink
+        with span("consultation"):
+            return await self.app.ainvoke(initial_state, config={"configurable": configurable})
+
+    def consult(self, initial_state, bypass_cache=False):
+        """상담 실행 (공유 이벤트 루프에서 진행하고 결과 대기)"""
+        return self.run_async(self.aconsult(initial_state, bypass_cache)).result()
+
+    def stream_consultation(self, initial_state, bypass_cache=False):
+        """상담 실행 중 ("token", 노드, 텍스트) 이벤트를 내보내고 마지막에 ("result", None, 상태)"""
+        events = queue.Queue()
+        
+        def token_sink(node, token):
+            events.put(("token", node, token))
+        
+        def done(future):
+            if future.exception() is not None:
+                events.put(("error", None, future.exception()))
+            else:
+                events.put(("result", None, future.result()))
+        
+        self.run_async(self.aconsult(initial_state, bypass_cache, token_sink)).add_done_callback(done)
+        
+        while True:
+            kind, node, payload = events.get()
+            if kind == "error":
+                raise payload
+            yield kind, node, payload
+            if kind == "result":
+                return
+
+    def embed_symptoms(self, state: GraphState, config=None) -> dict:
+        """증상 임베딩 (지식 검색과 영양제 의미 매칭에서 공유)"""
+        if self.embeddings is None:
+            return {"symptom_vector": None}
+        return {"symptom_vector": self.symptom_vector(state["symptoms"])}
+
+    def retrieve_context(self, state: GraphState, config=None) -> dict:
+        """RAG를 통한 관련 정보 검색"""
+        symptoms = state["symptoms"]
+        
+        if self.vectorstore:
+            relevant_docs = self.search_knowledge(symptoms, k=3, vector=state.get("symptom_vector"))
+            medical_context = "\n".join([doc.page_content for doc in relevant_docs])
+        else:
+            # 키워드 매칭 대체
+            incr("fallbacks", kind="keyword_rag")
+            medical_context = self.get_relevant_knowledge(symptoms, self.match_keywords(state))
+        
+        return {"medical_context": medical_context}
+
+    def symptom_prompt(self, state: GraphState):
+        pet_info = state["pet_info"]
+        return self.symptom_analysis_prompt.format(
+            pet_name=pet_info['name'],
+            pet_type=pet_info['type'],
+            pet_age=pet_info['age'],
+            pet_weight=pet_info['weight'],
+            symptoms=state["symptoms"],
+            medical_context=state["medical_context"]
+        )
+
+    def analysis_fallback(self, state: GraphState, error):
+        # OpenAI API 사용 불가시 규칙 기반 분석
+        print(f"OpenAI API 오류: {error}")
+        incr("fallbacks", kind="rule_based_analysis")
+        return self.rule_based_analysis(
+            state["pet_info"], state["symptoms"], state["medical_context"], self.match_keywords(state)
+        )
+
+    async def analyze_symptoms(self, state: GraphState, config=None) -> dict:
+        """LLM을 사용한 증상 분석"""
+        # 파인튜닝된 모델 사용
+        try:
+            prompt = self.symptom_prompt(state)
+            analysis = await self.generate(prompt, state["medical_context"], "analyze_symptoms", config)
+        except Exception as e:
+            analysis = self.analysis_fallback(state, e)
+        
+        return {"health_analysis": analysis}
+
+    def symptom_vector(self, symptoms):
+        """증상 쿼리 임베딩 (캐시 적중시 임베딩 모델 추론 생략)"""
+        key = ("vector", normalize_text(symptoms))
+        vector = self.query_cache.get(key)
+        incr("cache_requests", cache="query_vector", result="miss" if vector is None else "hit")
+        if vector is None:
+            with span("embedding"):
+                vector = self.embeddings.embed_query(key[1])
+            self.query_cache.set(key, vector)
+        return vector
+
+    def search_knowledge(self, symptoms, k=3, vector=None):
+        """벡터 검색 (이미 계산한 증상 벡터가 있으면 재사용)"""
+        key = (normalize_text(symptoms), k)
+        doc_ids = self.query_cache.get(key)
+        incr("cache_requests", cache="search", result="miss" if doc_ids is None else "hit")
+        if doc_ids is None:
+            if vector is None:
+                vector = self.symptom_vector(symptoms)
+            with span("vector_search"):
+                doc_ids = search_ids_by_vector(self.vectorstore, vector, k)
+            self.query_cache.set(key, doc_ids)
+        
+        return get_documents(self.vectorstore, doc_ids)
+
+    def get_relevant_knowledge(self, symptoms, matches=None):
+        """키워드 매칭을 통한 관련 지식 추출"""
+        if matches is None:
+            matches = self.keyword_matcher.scan(symptoms)
+        
+        relevant_knowledge = [
+            self.knowledge_map[info["knowledge_id"]]
+            for info in matches.values()
+            if info["knowledge_id"] is not None
+        ]
+        
+        return "\n".join(relevant_knowledge) if relevant_knowledge else "일반적인 수의학 지식을 바탕으로 분석합니다."
+
+    def rule_based_analysis(self, pet_info, symptoms, context, matches=None):
+        """규칙 기반 분석 (LLM 백업)"""
+        analysis = f"**{pet_info['name']}({pet_info['type']}, {pet_info['age']}세)의 건강 분석**\n\n"
+        
+        if matches is None:
+            matches = self.keyword_matcher.scan(symptoms)
+        groups = rule_groups_of(matches)
+        
+        if "관절" in groups:
+            analysis += """🔍 **관절 관련 문제 의심**
+• 관절염 또는 관절 손상 가능성
+• 노령견의 경우 퇴행성 관절염 가능성 높음
+• 소형견의 경우 슬개골 탈구 의심
+
+**추천 조치:**
+• 계단 사용 제한, 미끄럽지 않은 바닥재 사용
+• 관절 영양제 (글루코사민, 콘드로이틴) 고려
+• 체중 관리 중요
+• 수의사 진료 권장
+
+"""
+            
+        if "소화기" in groups:
+            analysis += """🔍 **소화기 문제 의심**
+• 급성 위장염 또는 식이 불내성 가능성
+• 스트레스나 식이 변화가 원인일 수 있음
+• 탈수 위험 주의
+
+**추천 조치:**
+• 12-24시간 금식 후 점진적 식이 재개
+• 소량씩 자주 급식
+• 프로바이오틱 고려
+• 증상 지속시 수의사 진료
+
+"""
+            
+        if "피부" in groups:
+            analysis += """🔍 **피부 관련 문제 의심**
+• 알레르기 피부염 또는 아토피 가능성
+• 음식 알레르기나 환경 알레르기 고려
+• 2차 세균 감염 주의
+
+**추천 조치:**
+• 알레르기 유발 요소 제거
+• 오메가3 지방산 보충
+• 항알레르기 샴푸 사용
+• 지속시 알레르기 검사 권장
+
+"""
+        
+        if "주요증상" not in groups:
+            analysis += """🔍 **일반적인 건강 관리**
+• 구체적인 질병 징후는 발견되지 않음
+• 예방적 건강 관리 중요
+• 정기적인 건강검진 권장
+
+**추천 조치:**
+• 균형잡힌 영양 공급
+• 적절한 운동과 스트레스 관리
+• 정기적인 건강검진
+
+"""
+        
+        analysis += "\n⚠️ **중요**: 이 분석은 참고용이며, 정확한 진단과 치료를 위해서는 전문 수의사와 상담하시기 바랍니다."
+        
+        return analysis
+
+    def fetch_supplements(self, categories, pet_info=None, query_vector=None):
+        """카테고리 매칭/증상 의미 매칭/나이·체중 적합도/평점 기준 상위 영양제 (최대 3개)"""
+        if not categories and query_vector is None:
+            return []
+        return self.supplement_ranker.rank(categories, pet_info, k=3, query_vector=query_vector)
+
+    def select_supplements(self, state: GraphState, config=None) -> dict:
+        """증상 키워드 기반 영양제 후보 조회 (증상 분석과 병렬 실행)"""
+        categories = categories_of(self.match_keywords(state))
+        return {
+            "supplement_categories": categories,
+            "supplement_candidates": self.fetch_supplements(
+                categories, state["pet_info"], state.get("symptom_vector")
+            ),
+        }
+
+    def select_recommendations(self, state: GraphState):
+        """최종 추천 후보 영양제 행"""
+        pet_info = state["pet_info"]
+        health_analysis = state["health_analysis"]
+        
+        # 분석 결과에서 새로 발견된 카테고리가 있을 때만 다시 순위 계산
+        symptom_categories = state.get("supplement_categories", [])
+        recommendations = list(state.get("supplement_candidates", []))
+        extra_categories = [
+            category for category in categories_of(self.keyword_matcher.scan(health_analysis))
+            if category not in symptom_categories
+        ]
+        if extra_categories:
+            recommendations = self.fetch_supplements(
+                symptom_categories + extra_categories, pet_info, state.get("symptom_vector")
+            )
+        
+        # 키워드/의미 매칭 모두 없으면 기본 종합영양제
+        if not recommendations:
+            incr("fallbacks", kind="default_supplements")
+            recommendations = self.fetch_supplements(["종합영양"], pet_info)
+        return recommendations
+
+    def supplement_prompt(self, state: GraphState, recommendations):
+        pet_info = state["pet_info"]
+        return self.supplement_recommendation_prompt.format(
+            health_analysis=state["health_analysis"],
+            pet_type=pet_info['type'],
+            pet_age=pet_info['age'],
+            pet_weight=pet_info['weight'],
+            available_supplements=self.format_supplements_for_llm(recommendations)
+        )
+
+    async def recommend_supplements(self, state: GraphState, config=None) -> dict:
+        """영양제 추천"""
+        # 카탈로그 조회(SQLite)만 실행기에서
+        recommendations = await self.run_blocking(self.select_recommendations, state)
+        
+        # 파인튜닝된 모델을 통한 영양제 추천 (선택적)
+        try:
+            prompt = self.supplement_prompt(state, recommendations)
+            llm_recommendation = await self.generate(prompt, SUPPLEMENT_SYSTEM_PROMPT, "recommend_supplements", config)
+        except Exception as e:
+            print(f"LLM 추천 오류: {e}")
+            incr("fallbacks", kind="llm_recommendation")
+            llm_recommendation = None
+        
+        return {"supplement_recommendations": self.supplement_list(recommendations, llm_recommendation)}
+
+    def supplement_list(self, recommendations, llm_recommendation):
+        """영양제 정보를 딕셔너리 형태로 변환"""
+        supplement_list = []
+        for rec in recommendations[:3]:  # 최대 3개까지
+            supplement_info = {
+                'id': rec[0],
+                'name': rec[1],
+                'brand': rec[2],
+                'category': rec[3],
+                'description': rec[4],
+                'ingredients': rec[5],
+                'recommended_for': rec[6],
+                'dosage': rec[7],
+                'price': rec[8],
+                'rating': rec[9],
+                'side_effects': rec[10] if len(rec) > 10 else "알려진 부작용 없음",
+                'contraindications': rec[11] if len(rec) > 11 else "특별한 금기사항 없음",
+                'llm_analysis': llm_recommendation if llm_recommendation else "기본 추천"
+            }
+            supplement_list.append(supplement_info)
+        
+        return supplement_list
+
+    def format_supplements_for_llm(self, supplements):
+        """LLM에 전달할 영양제 정보 포맷"""
+        formatted = []
+        for supp in supplements:
+            formatted.append(f"""
+제품명: {supp[1]}
+브랜드: {supp[2]}
+카테고리: {supp[3]}
+설명: {supp[4]}
+주요 성분: {supp[5]}
+추천 대상: {supp[6]}
+복용법: {supp[7]}
+가격: {supp[8]:,}원
+평점: {supp[9]}/5.0
+부작용: {supp[10] if len(supp) > 10 else '없음'}
+금기사항: {supp[11] if len(supp) > 11 else '없음'}
+""")
+        return "\n".join(formatted)
+
+    def save_consultation(self, state: GraphState, config=None) -> dict:
+        """상담 내용 저장 (저널 기록 후 큐에 추가, DB 반영은 백그라운드에서 배치 처리)"""
+        if not ((config or {}).get("configurable") or {}).get("persist", True):
+            return {"consultation_id": ""}
+        
+        recommendations_json = json.dumps(state["supplement_recommendations"], ensure_ascii=False)
+        
+        consultation_id = self.consultation_writer.enqueue(
+            state["pet_info"],
+            state['symptoms'],
+            state['health_analysis'],
+            recommendations_json
+        )
+        
+        return {"consultation_id": str(consultation_id)}
+
+    def get_consultation_history(self, limit=10):
+        """상담 이력 조회"""
+        history_df, _ = self.get_consultation_page(limit=limit)
+        return history_df
+
+    def get_consultation_page(self, limit=20, cursor=None, pet_name=None, pet_type=None,
+                              date_from=None, date_to=None):
+        """상담 이력 페이지 조회 (최신순 keyset 페이지네이션)
+        
+        cursor 는 이전 페이지 마지막 행의 (timestamp, id) 이며,
+        (DataFrame, 다음 페이지 cursor 또는 None) 을 반환한다.
+        """
+        # 방금 완료된 상담도 보이도록 대기 중인 기록 먼저 저장
+        self.consultation_writer.flush()
+        
+        conditions = []
+        params = []
+        if pet_name:
+            conditions.append("pet_name = ?")
+            params.append(pet_name)
+        if pet_type:
+            conditions.append("pet_type = ?")
+            params.append(pet_type)
+        # timestamp 는 UTC 로 저장되므로 로컬 날짜 범위를 UTC 경계로 변환
+        if date_from:
+            conditions.append("timestamp >= ?")
+            params.append(utc_day_start(date_from))
+        if date_to:
+            # 종료일 당일 포함
+            conditions.append("timestamp < ?")
+            params.append(utc_day_start(date_to + timedelta(days=1)))
+        if cursor:
+            conditions.append("(timestamp, id) < (?, ?)")
+            params.extend(cursor)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f'''
+            SELECT id, pet_name, pet_type, symptoms, timestamp, health_analysis
+            FROM consultations 
+            {where}
+            ORDER BY timestamp DESC, id DESC 
+            LIMIT ?
+        '''
+        
+        # 한 행 더 조회해서 다음 페이지 존재 여부 확인
+        history_df = self.db.read_dataframe(query, params=(*params, limit + 1))
+        next_cursor = None
+        if len(history_df) > limit:
+            history_df = history_df.iloc[:limit]
+            last = history_df.iloc[-1]
+            next_cursor = (last['timestamp'], int(last['id']))
+        
+        return history_df, next_cursor
+    
+    def search_consultations(self, query, limit=20):
+        """상담 이력 전문 검색 (증상/분석 내용, 관련도 순)
+        
+        trigram 색인은 3글자 이상만 검색되므로 "절뚝" 같은 2글자 검색어는
+        최신순 인덱스를 따라 LIKE 로 확인하며 limit 건을 찾으면 중단한다.
+        """
+        self.consultation_writer.flush()
+        
+        terms = query.split()
+        if not terms:
+            return pd.DataFrame()
+        
+        long_terms = [t for t in terms if len(t) >= 3] if self.fts_enabled else []
+        short_terms = [t for t in terms if t not in long_terms]
+        
+        like_conditions = []
+        like_params = []
+        for term in short_terms:
+            pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            like_conditions.append("(c.symptoms LIKE ? ESCAPE '\\' OR c.health_analysis LIKE ? ESCAPE '\\')")
+            like_params.extend([pattern, pattern])
+        
+        if long_terms:
+            # 각 검색어를 구문으로 감싸 FTS 문법 문자를 무력화 (공백 구분 = AND)
+            match = " ".join('"' + t.replace('"', '""') + '"' for t in long_terms)
+            conditions = ["consultations_fts MATCH ?"] + like_conditions
+            sql = f'''
+                SELECT c.id, c.pet_name, c.pet_type, c.symptoms, c.timestamp, c.health_analysis,
+                       snippet(consultations_fts, -1, '**', '**', '…', 24) AS snippet,
+                       bm25(consultations_fts) AS score
+                FROM consultations_fts
+                JOIN consultations c ON c.id = consultations_fts.rowid
+                WHERE {' AND '.join(conditions)}
+                ORDER BY score
+                LIMIT ?
+            '''
+            params = (match, *like_params, limit)
+        else:
+            sql = f'''
+                SELECT c.id, c.pet_name, c.pet_type, c.symptoms, c.timestamp, c.health_analysis,
+                       NULL AS snippet, NULL AS score
+                FROM consultations c
+                WHERE {' AND '.join(like_conditions)}
+                ORDER BY c.timestamp DESC, c.id DESC
+                LIMIT ?
+            '''
+            params = (*like_params, limit)
+        
+        return self.db.read_dataframe(sql, params=params)
+
+    def reset_database(self):
+        """데이터베이스 초기화"""
+        self.consultation_writer.flush()
+        
+        # 모든 테이블 삭제 후 마이그레이션 재적용
+        reset_schema(self.db)
+        # 삭제된 id_allocator 기준으로 예약한 블록은 다른 프로세스의 새 예약과 겹칠 수 있음
+        self.consultation_writer.reset_ids()
+        self.fts_enabled = fulltext_search_available(self.db)
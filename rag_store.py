@@ -0,0 +1,280 @@
+"""RAG 벡터스토어 디스크 캐시 및 증분 수집"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from typing import List
+
+from langchain.vectorstores import FAISS
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.schema import Document
+
+INDEX_DIR = "rag_index"
+KNOWLEDGE_DIR = "knowledge_base"
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+MANIFEST_FILE = "manifest.json"
+SUPPORTED_EXTENSIONS = (".md", ".txt", ".jsonl")
+
+
+def _sha256(*parts: str) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        data = part.encode("utf-8")
+        # 길이 접두어로 경계를 구분
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h.hexdigest()
+
+
+def settings_key(model_name: str, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP) -> str:
+    """임베딩 모델 + 분할 설정 기준 인덱스 키"""
+    settings = {"model": model_name, "chunk_size": chunk_size, "chunk_overlap": chunk_overlap}
+    return _sha256(json.dumps(settings, sort_keys=True))[:16]
+
+
+def corpus_fingerprint(documents: List[Document]) -> str:
+    """코퍼스 전체 해시 (변경이 없으면 분할/임베딩 생략)"""
+    return _sha256(*(f"{doc.metadata.get('source', '')}\0{doc.page_content}" for doc in documents))
+
+
+def chunk_id(text: str) -> str:
+    """청크 내용 해시 = 벡터스토어 문서 ID"""
+    return _sha256(text)
+
+
+def split_corpus(documents: List[Document], chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """문서 분할"""
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return text_splitter.split_documents(documents)
+
+
+def load_documents(directory=KNOWLEDGE_DIR) -> List[Document]:
+    """디렉터리의 md/txt/jsonl 문서 읽기"""
+    documents = []
+    if not os.path.isdir(directory):
+        return documents
+
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            ext = os.path.splitext(name)[1].lower()
+            if ext not in SUPPORTED_EXTENSIONS:
+                continue
+
+            with open(path, encoding="utf-8") as f:
+                if ext == ".jsonl":
+                    for line_no, line in enumerate(f, 1):
+                        line = line.strip()
+                        if not line:
+                            continue
+                        record = json.loads(line)
+                        text = record.pop("text", None) or record.pop("page_content", None) or record.pop("content", "")
+                        if text:
+                            record.setdefault("source", f"{path}:{line_no}")
+                            documents.append(Document(page_content=text, metadata=record))
+                else:
+                    text = f.read().strip()
+                    if text:
+                        documents.append(Document(page_content=text, metadata={"source": path}))
+    return documents
+
+
+def _read_faiss_index(index_path, mmap):
+    import faiss
+
+    if not mmap:
+        return faiss.read_index(index_path)
+    # IndexFlat 메모리 매핑은 faiss 1.10+ 의 IO_FLAG_MMAP_IFC 에서 지원
+    mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+    try:
+        return faiss.read_index(index_path, mmap_flag | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        return faiss.read_index(index_path)
+
+
+def read_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_vectorstore(path, embeddings, mmap=True):
+    """저장된 FAISS 인덱스 로드 (기본: 메모리 매핑 읽기 전용)"""
+    index = _read_faiss_index(os.path.join(path, "index.faiss"), mmap)
+    with open(os.path.join(path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def search_ids_by_vector(vectorstore, vector, k=3):
+    """쿼리 벡터로 상위 k개 문서 ID 검색"""
+    import faiss
+    import numpy as np
+
+    query = np.array([vector], dtype=np.float32)
+    if getattr(vectorstore, "_normalize_L2", False):
+        faiss.normalize_L2(query)
+    _, indices = vectorstore.index.search(query, k)
+    return [vectorstore.index_to_docstore_id[i] for i in indices[0] if i != -1]
+
+
+def get_documents(vectorstore, doc_ids):
+    """문서 ID로 docstore 조회"""
+    documents = []
+    for doc_id in doc_ids:
+        doc = vectorstore.docstore.search(doc_id)
+        if isinstance(doc, Document):
+            documents.append(doc)
+    return documents
+
+
+def save_vectorstore(vectorstore, path, manifest):
+    """임시 디렉터리에 저장 후 교체"""
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=parent)
+    try:
+        vectorstore.save_local(tmp_dir)
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        old_dir = None
+        if os.path.exists(path):
+            old_dir = tempfile.mkdtemp(prefix=".old-", dir=parent)
+            os.rmdir(old_dir)
+            os.rename(path, old_dir)
+        os.rename(tmp_dir, path)
+        if old_dir:
+            # 기존 인덱스를 메모리 매핑 중인 프로세스는 unlink 후에도 계속 읽을 수 있음
+            shutil.rmtree(old_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def prune_stale_indexes(index_dir, keep):
+    """현재 설정이 아닌 오래된 인덱스 삭제"""
+    for name in os.listdir(index_dir):
+        if name != keep and not name.startswith("."):
+            shutil.rmtree(os.path.join(index_dir, name), ignore_errors=True)
+
+
+@contextlib.contextmanager
+def _index_lock(index_dir):
+    """여러 워커가 동시에 인덱스를 갱신하지 않도록 파일 잠금"""
+    os.makedirs(index_dir, exist_ok=True)
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(os.path.join(index_dir, ".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def sync_vectorstore(vectorstore, documents: List[Document], embeddings,
+                     chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """청크 해시 비교로 새/변경 청크만 임베딩하고 삭제된 청크는 제거"""
+    chunks = {}
+    for split in split_corpus(documents, chunk_size, chunk_overlap):
+        chunks.setdefault(chunk_id(split.page_content), split)
+
+    if vectorstore is None:
+        ids = list(chunks)
+        vectorstore = FAISS.from_documents([chunks[i] for i in ids], embeddings, ids=ids)
+        return vectorstore, len(ids), 0
+
+    existing = set(vectorstore.index_to_docstore_id.values())
+    removed = [i for i in existing if i not in chunks]
+    added = [i for i in chunks if i not in existing]
+
+    if removed:
+        vectorstore.delete(removed)
+    if added:
+        vectorstore.add_documents([chunks[i] for i in added], ids=added)
+    return vectorstore, len(added), len(removed)
+
+
+def load_or_build_vectorstore(documents: List[Document], embeddings, model_name: str,
+                              index_dir=INDEX_DIR, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """코퍼스 해시가 같으면 디스크 인덱스를 로드하고, 바뀐 경우 증분 갱신"""
+    key = settings_key(model_name, chunk_size, chunk_overlap)
+    path = os.path.join(index_dir, key)
+    fingerprint = corpus_fingerprint(documents)
+
+    # 매니페스트는 맞는데 인덱스 파일이 깨진 경우, 잠금 안에서 같은 매니페스트로 다시 로드하지 않고 재생성
+    load_failed = False
+    manifest = read_manifest(path)
+    if manifest and manifest.get("fingerprint") == fingerprint:
+        try:
+            return load_vectorstore(path, embeddings)
+        except Exception as e:
+            print(f"벡터 인덱스 로드 실패, 재생성합니다: {e}")
+            load_failed = True
+
+    with _index_lock(index_dir):
+        # 잠금 대기 중 다른 워커가 이미 갱신했을 수 있음
+        manifest = None if load_failed else read_manifest(path)
+        if manifest and manifest.get("fingerprint") == fingerprint:
+            return load_vectorstore(path, embeddings)
+
+        vectorstore = None
+        if manifest:
+            try:
+                vectorstore = load_vectorstore(path, embeddings, mmap=False)
+            except Exception as e:
+                print(f"기존 벡터 인덱스를 읽을 수 없어 전체 재생성합니다: {e}")
+
+        vectorstore, added, removed = sync_vectorstore(
+            vectorstore, documents, embeddings, chunk_size, chunk_overlap
+        )
+        save_vectorstore(vectorstore, path, {
+            "fingerprint": fingerprint,
+            "model": model_name,
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "chunks": len(vectorstore.index_to_docstore_id),
+        })
+        prune_stale_indexes(index_dir, keep=key)
+        print(f"벡터 인덱스 갱신: 추가 {added}개, 삭제 {removed}개 청크")
+    return vectorstore
+
+
+def main(argv=None):
+    """지식베이스 디렉터리를 벡터 인덱스에 반영 (배포 전 사전 수집용)"""
+    parser = argparse.ArgumentParser(description="수의학 지식베이스 증분 수집")
+    parser.add_argument("directory", nargs="?", default=KNOWLEDGE_DIR)
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--backend", default="torch", choices=["torch", "int8", "onnx"])
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=None, help="기본값: CPU 코어 수")
+    parser.add_argument("--pool", default="process", choices=["thread", "process"])
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    args = parser.parse_args(argv)
+
+    from embedding_pipeline import ParallelEmbeddings
+
+    documents = load_documents(args.directory)
+    embeddings = ParallelEmbeddings(
+        model_name=args.model, backend=args.backend, batch_size=args.batch_size,
+        workers=args.workers, pool=args.pool,
+    )
+    try:
+        vectorstore = load_or_build_vectorstore(documents, embeddings, embeddings.model_id, index_dir=args.index_dir)
+    finally:
+        embeddings.close()
+    print(f"문서 {len(documents)}개, 청크 {len(vectorstore.index_to_docstore_id)}개")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""DB 스키마 버전 관리 (PRAGMA user_version 기반 마이그레이션)
+
+스키마가 최신이면 시작 시 user_version 읽기만 수행하고 쓰기 잠금을 잡지 않는다.
+스키마/시드 데이터를 바꿀 때는 기존 마이그레이션을 수정하지 말고 MIGRATIONS 에 새 버전을 추가한다.
+"""
+import sqlite3
+
+# supplements 테이블 컬럼 (일괄 가져오기 검증용)
+SUPPLEMENT_COLUMNS = (
+    "id", "name", "brand", "category", "description", "ingredients", "recommended_for",
+    "dosage", "price", "rating", "side_effects", "contraindications",
+)
+
+# 향상된 영양제 샘플 데이터
+SAMPLE_SUPPLEMENTS = [
+    (1, "관절 케어 플러스", "펫라이프", "관절건강", "글루코사민과 콘드로이틴이 풍부한 관절 건강 영양제", 
+     "글루코사민, 콘드로이틴, MSM, 콜라겐", "관절염, 관절 통증, 노령견, 대형견", "체중 10kg당 1정", 35000, 4.5,
+     "드물게 위장 장애", "신장 질환, 당뇨병 주의"),
+
+    (2, "소화 건강 프로바이오틱", "펫케어", "소화기건강", "10억 CFU 유산균과 소화효소가 함유된 소화 개선 영양제",
+     "락토바실러스, 비피도박테리움, 프레바이오틱", "소화불량, 설사, 변비, 장염", "1일 1회 1포", 28000, 4.3,
+     "초기 가스 증가 가능", "면역억제제 복용시 주의"),
+
+    (3, "멀티 비타민 & 미네랄", "펫비타", "종합영양", "반려동물 전용 종합 비타민 미네랄 복합제",
+     "비타민 A,B,C,D,E, 아연, 철분, 엽산", "영양 보충, 면역력 강화, 성장기", "체중 5kg당 0.5정", 22000, 4.1,
+     "과량 섭취시 비타민 과다증", "간 질환시 철분 섭취 주의"),
+
+    (4, "오메가3 피쉬오일", "마린펫", "피부모질", "순수 알래스카 연어에서 추출한 고농도 오메가3",
+     "EPA 300mg, DHA 200mg, 비타민E", "피부염, 털빠짐, 알레르기, 심장건강", "체중 5kg당 0.5ml", 31000, 4.6,
+     "드물게 생선 알레르기", "혈액응고장애 약물과 병용 주의"),
+
+    (5, "간 건강 실리마린", "펫리버", "간기능", "밀크씨슬에서 추출한 고농도 실리마린",
+     "실리마린 80%, 타우린, 비타민B", "간기능 저하, 해독, 간염 회복", "체중 10kg당 1정", 26000, 4.4,
+     "드물게 알레르기 반응", "담관 폐쇄시 금기"),
+
+    (6, "면역력 강화 베타글루칸", "이뮨펫", "면역강화", "효모에서 추출한 베타글루칸과 면역 복합체",
+     "베타글루칸, 아연, 셀레늄, 비타민C", "면역력 저하, 반복 감염, 회복기", "1일 1회 1캡슐", 33000, 4.2,
+     "없음", "자가면역질환시 주의"),
+
+    (7, "심장 건강 코엔자임Q10", "카디오펫", "심장건강", "심장 근육 에너지 생산을 돕는 코엔자임Q10",
+     "코엔자임Q10, L-카르니틴, 타우린", "심장병, 호흡곤란, 기침, 노령견", "체중 10kg당 1정", 38000, 4.3,
+     "드물게 위장 장애", "혈압약 복용시 상담 필요"),
+
+    (8, "요로 건강 크랜베리", "유로펫", "비뇨기건강", "크랜베리 추출물과 D-만노스가 함유된 요로 건강제",
+     "크랜베리 추출물, D-만노스, 비타민C", "방광염, 요로감염, 혈뇨", "1일 2회 1정", 29000, 4.0,
+     "드물게 설사", "신장결석 병력시 주의")
+]
+
+
+def _v1_base_tables(conn):
+    """상담 기록/영양제 테이블 및 샘플 영양제"""
+    # 상담 기록 테이블
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS consultations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pet_name TEXT,
+            pet_type TEXT,
+            pet_age INTEGER,
+            pet_weight REAL,
+            symptoms TEXT,
+            health_analysis TEXT,
+            recommendations TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 영양제 데이터베이스
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS supplements (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            brand TEXT,
+            category TEXT,
+            description TEXT,
+            ingredients TEXT,
+            recommended_for TEXT,
+            dosage TEXT,
+            price REAL,
+            rating REAL,
+            side_effects TEXT,
+            contraindications TEXT
+        )
+    ''')
+
+    conn.executemany('''
+        INSERT OR REPLACE INTO supplements
+        (id, name, brand, category, description, ingredients, recommended_for,
+         dosage, price, rating, side_effects, contraindications)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', SAMPLE_SUPPLEMENTS)
+
+
+def _v2_history_indexes(conn):
+    """이력 조회용 인덱스 (최신순 정렬 + 반려동물 필터)"""
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_consultations_timestamp ON consultations (timestamp DESC, id DESC)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_consultations_pet_name ON consultations (pet_name, timestamp DESC, id DESC)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_consultations_pet_type ON consultations (pet_type, timestamp DESC, id DESC)')
+
+
+def _v3_id_allocator(conn):
+    """상담 ID 블록 예약 (write-behind 저장용)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS id_allocator (
+            name TEXT PRIMARY KEY,
+            next_id INTEGER NOT NULL
+        )
+    ''')
+
+
+def _v4_fulltext_search(conn):
+    """상담 이력 전문 검색 (FTS5 trigram - 한국어 부분 문자열 검색)"""
+    # FTS5/trigram 미지원 SQLite (3.34 미만) 에서는 이 단계만 건너뜀
+    conn.execute("SAVEPOINT fulltext_search")
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS consultations_fts USING fts5(
+                symptoms, health_analysis,
+                content='consultations', content_rowid='id',
+                tokenize='trigram'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        conn.execute("ROLLBACK TO fulltext_search")
+        conn.execute("RELEASE fulltext_search")
+        print(f"전문 검색 비활성화: {e}")
+        return
+
+    # 원본 테이블과 동기화
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS consultations_fts_insert AFTER INSERT ON consultations BEGIN
+            INSERT INTO consultations_fts (rowid, symptoms, health_analysis)
+            VALUES (new.id, new.symptoms, new.health_analysis);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS consultations_fts_delete AFTER DELETE ON consultations BEGIN
+            INSERT INTO consultations_fts (consultations_fts, rowid, symptoms, health_analysis)
+            VALUES ('delete', old.id, old.symptoms, old.health_analysis);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS consultations_fts_update AFTER UPDATE ON consultations BEGIN
+            INSERT INTO consultations_fts (consultations_fts, rowid, symptoms, health_analysis)
+            VALUES ('delete', old.id, old.symptoms, old.health_analysis);
+            INSERT INTO consultations_fts (rowid, symptoms, health_analysis)
+            VALUES (new.id, new.symptoms, new.health_analysis);
+        END
+    ''')
+
+    # 기존 기록 색인
+    conn.execute("INSERT INTO consultations_fts (consultations_fts) VALUES ('rebuild')")
+    conn.execute("RELEASE fulltext_search")
+
+
+def _v5_supplement_indexes(conn):
+    """카테고리별 평점순 영양제 조회 인덱스"""
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_supplements_category_rating ON supplements (category, rating DESC)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_supplements_rating ON supplements (rating DESC)')
+
+
+def _v6_catalog_filter_index(conn):
+    """카탈로그 필터(카테고리/평점/가격) 복합 인덱스 (v5 카테고리 인덱스 대체)"""
+    conn.execute('DROP INDEX IF EXISTS idx_supplements_category_rating')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_supplements_category_rating_price
+        ON supplements (category, rating DESC, price)
+    ''')
+
+
+def _v7_catalog_version(conn):
+    """영양제 카탈로그 변경 카운터 (메모리 캐시 무효화용)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS supplements_version_{event.lower()} AFTER {event} ON supplements BEGIN
+                UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+
+
+# (버전, 마이그레이션) - 순서대로 한 번씩만 적용
+MIGRATIONS = [
+    (1, _v1_base_tables),
+    (2, _v2_history_indexes),
+    (3, _v3_id_allocator),
+    (4, _v4_fulltext_search),
+    (5, _v5_supplement_indexes),
+    (6, _v6_catalog_filter_index),
+    (7, _v7_catalog_version),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# reset_schema 에서 삭제할 테이블 (가상 테이블 먼저)
+TABLES = ["consultations_fts", "consultations", "supplements", "id_allocator", "catalog_version"]
+
+
+def schema_version(pool):
+    return pool.query_one("PRAGMA user_version")[0]
+
+
+def migrate(pool):
+    """필요한 마이그레이션 적용, 적용한 버전 목록 반환"""
+    # 최신이면 읽기만 하고 종료
+    if schema_version(pool) >= SCHEMA_VERSION:
+        return []
+
+    applied = []
+    with pool.connection() as conn:
+        # 여러 워커가 동시에 시작해도 한 곳에서만 적용
+        conn.execute("BEGIN IMMEDIATE")
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        for version, migration in MIGRATIONS:
+            if version <= current:
+                continue
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            applied.append(version)
+    return applied
+
+
+def reset_schema(pool):
+    """모든 테이블 삭제 후 처음부터 다시 적용"""
+    with pool.connection() as conn:
+        for table in TABLES:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute("PRAGMA user_version = 0")
+    return migrate(pool)
+
+
+def fulltext_search_available(pool):
+    return pool.query_one(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'consultations_fts'"
+    ) is not None
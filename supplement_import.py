@@ -0,0 +1,183 @@
+"""영양제 카탈로그 일괄 가져오기 (CSV/JSONL)
+
+사용법:
+    python supplement_import.py catalog.csv
+    python supplement_import.py catalog.jsonl --chunk-size 5000
+
+파일을 한 줄씩 읽어 chunk_size 건마다 한 트랜잭션으로 upsert 하므로
+파일 크기와 관계없이 메모리 사용량이 일정하다.
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+from db import DB_PATH, get_pool
+from schema import SUPPLEMENT_COLUMNS, migrate
+
+REQUIRED_COLUMNS = ("id", "name", "category")
+INTEGER_COLUMNS = ("id",)
+REAL_COLUMNS = ("price", "rating")
+
+
+class CatalogError(ValueError):
+    """카탈로그 파일 형식 오류"""
+
+
+def read_records(path, file_format=None):
+    """CSV/JSONL 레코드를 한 건씩 반환 (줄 번호, dict)"""
+    file_format = file_format or os.path.splitext(path)[1].lstrip(".").lower()
+    if file_format == "csv":
+        # 엑셀에서 저장한 UTF-8 BOM 허용
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            for line_no, row in enumerate(csv.DictReader(f), 2):
+                yield line_no, row
+    elif file_format == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_no, json.loads(line)
+    else:
+        raise CatalogError(f"지원하지 않는 형식: {file_format} (csv, jsonl)")
+
+
+def validate_columns(columns):
+    """컬럼을 supplements 스키마와 대조"""
+    unknown = [c for c in columns if c not in SUPPLEMENT_COLUMNS]
+    if unknown:
+        raise CatalogError(f"알 수 없는 컬럼: {', '.join(unknown)}")
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise CatalogError(f"필수 컬럼 누락: {', '.join(missing)}")
+
+
+def convert_row(record, columns):
+    """레코드를 컬럼 순서의 튜플로 변환 (형식 오류시 ValueError)"""
+    values = []
+    for column in columns:
+        value = record.get(column)
+        if value == "":
+            value = None
+        if value is not None:
+            if column in INTEGER_COLUMNS:
+                value = int(value)
+            elif column in REAL_COLUMNS:
+                value = float(value)
+                if value < 0 or (column == "rating" and value > 5):
+                    raise ValueError(f"{column} 범위 오류: {value}")
+        elif column in REQUIRED_COLUMNS:
+            raise ValueError(f"{column} 값 없음")
+        values.append(value)
+    return tuple(values)
+
+
+def upsert_sql(columns):
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != "id")
+    return f'''
+        INSERT INTO supplements ({", ".join(columns)})
+        VALUES ({", ".join("?" for _ in columns)})
+        ON CONFLICT(id) DO UPDATE SET {updates}
+    '''
+
+
+def import_catalog(path, pool=None, chunk_size=1000, file_format=None, rebuild_indexes=True,
+                   max_errors=20):
+    """카탈로그 파일을 supplements 테이블에 upsert, 처리 통계 반환"""
+    pool = pool or get_pool()
+    migrate(pool)
+
+    records = read_records(path, file_format)
+    first = next(records, None)
+    if first is None:
+        return {"rows": 0, "skipped": 0, "errors": [], "seconds": 0.0, "rows_per_sec": 0.0}
+
+    columns = tuple(first[1].keys())
+    validate_columns(columns)
+    sql = upsert_sql(columns)
+
+    start = time.perf_counter()
+    imported = 0
+    skipped = 0
+    errors = []
+
+    # 대량 입력 중에는 인덱스를 내렸다가 마지막에 한 번에 다시 생성
+    indexes = []
+    if rebuild_indexes:
+        indexes = pool.query(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'supplements' AND sql IS NOT NULL"
+        )
+        with pool.connection() as conn:
+            for name, _ in indexes:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+    try:
+        all_records = itertools.chain([first], records)
+        while True:
+            batch = list(itertools.islice(all_records, chunk_size))
+            if not batch:
+                break
+            chunk = []
+            for line_no, record in batch:
+                try:
+                    extra = set(record) - set(columns)
+                    if extra:
+                        raise ValueError(f"첫 행에 없는 컬럼: {', '.join(sorted(extra))}")
+                    chunk.append(convert_row(record, columns))
+                except (ValueError, TypeError) as e:
+                    skipped += 1
+                    if len(errors) < max_errors:
+                        errors.append(f"{line_no}행: {e}")
+            if chunk:
+                with pool.connection() as conn:
+                    conn.executemany(sql, chunk)
+                imported += len(chunk)
+    finally:
+        if indexes:
+            with pool.connection() as conn:
+                for _, index_sql in indexes:
+                    conn.execute(index_sql)
+                conn.execute("ANALYZE supplements")
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": imported,
+        "skipped": skipped,
+        "errors": errors,
+        "seconds": elapsed,
+        "rows_per_sec": imported / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="영양제 카탈로그 일괄 가져오기")
+    parser.add_argument("path", help="CSV 또는 JSONL 파일")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="기본값: 확장자로 판단")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="트랜잭션당 행 수")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--keep-indexes", action="store_true", help="인덱스를 유지한 채 입력")
+    args = parser.parse_args(argv)
+
+    try:
+        stats = import_catalog(
+            args.path,
+            pool=get_pool(args.db),
+            chunk_size=args.chunk_size,
+            file_format=args.format,
+            rebuild_indexes=not args.keep_indexes,
+        )
+    except CatalogError as e:
+        print(f"가져오기 실패: {e}", file=sys.stderr)
+        return 1
+
+    for error in stats["errors"]:
+        print(f"  건너뜀 - {error}", file=sys.stderr)
+    print(f"{stats['rows']}건 가져옴, {stats['skipped']}건 건너뜀 "
+          f"({stats['seconds']:.2f}초, {stats['rows_per_sec']:.0f} rows/sec)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
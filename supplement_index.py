@@ -0,0 +1,88 @@
+"""영양제 설명 임베딩 인덱스 (증상-영양제 의미 매칭)
+
+영양제별 추천 대상/설명 텍스트를 임베딩해 디스크에 캐시한다.
+제품마다 텍스트 해시를 저장하므로 카탈로그가 바뀌면 바뀐 제품만 다시 임베딩한다.
+"""
+import os
+import tempfile
+
+import numpy as np
+
+from rag_store import _index_lock, chunk_id, settings_key
+
+INDEX_DIR = "supplement_index"
+
+
+def supplement_text(row):
+    """임베딩 대상 텍스트 (제품명/카테고리/추천 대상/설명/성분)"""
+    _, name, _, category, description, ingredients, recommended_for = row[:7]
+    return f"{name} ({category})\n추천 대상: {recommended_for or ''}\n{description or ''}\n주요 성분: {ingredients or ''}"
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class SupplementIndex:
+    """영양제 임베딩 행렬 (코사인 유사도용 정규화 벡터)"""
+
+    def __init__(self, embeddings, model_name, index_dir=INDEX_DIR):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.index_dir = index_dir
+        self.path = os.path.join(index_dir, f"{settings_key(model_name)}.npz")
+        self.last_embedded = 0
+
+    def _read_cache(self):
+        try:
+            with np.load(self.path) as data:
+                return dict(zip(data["hashes"].tolist(), data["vectors"]))
+        except (OSError, KeyError, ValueError):
+            return {}
+
+    def _write_cache(self, hashes, vectors):
+        os.makedirs(self.index_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".npz", dir=self.index_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, hashes=np.array(hashes), vectors=vectors)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        # 다른 임베딩 모델의 캐시 삭제
+        for name in os.listdir(self.index_dir):
+            if name.endswith(".npz") and os.path.join(self.index_dir, name) != self.path:
+                os.remove(os.path.join(self.index_dir, name))
+
+    def sync(self, rows):
+        """카탈로그 행 순서에 맞춘 임베딩 행렬 (변경된 제품만 새로 임베딩)"""
+        if not rows:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        texts = [supplement_text(row) for row in rows]
+        # 파일이 모델별로 분리되어 있으므로 텍스트 해시만으로 충분
+        hashes = [chunk_id(text) for text in texts]
+        cached = self._read_cache()
+        missing = [i for i, h in enumerate(hashes) if h not in cached]
+        if missing:
+            with _index_lock(self.index_dir):
+                # 잠금 대기 중 다른 워커가 이미 임베딩했을 수 있음
+                cached = self._read_cache()
+                missing = [i for i, h in enumerate(hashes) if h not in cached]
+                if missing:
+                    new_vectors = _normalize(self.embeddings.embed_documents([texts[i] for i in missing]))
+                    for i, vector in zip(missing, new_vectors):
+                        cached[hashes[i]] = vector
+                    # 카탈로그에서 사라진 제품은 캐시에서도 제거
+                    self._write_cache(hashes, np.stack([cached[h] for h in hashes]))
+                    print(f"영양제 임베딩 갱신: {len(missing)}개 제품")
+        self.last_embedded = len(missing)
+        return np.stack([cached[h] for h in hashes])
+
+    @staticmethod
+    def similarity(matrix, query_vector):
+        """정규화된 행렬과 질의 벡터의 코사인 유사도"""
+        return matrix @ _normalize(query_vector)
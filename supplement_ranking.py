@@ -0,0 +1,180 @@
+"""영양제 추천 순위 엔진
+
+카탈로그 전체를 컬럼별 NumPy 배열로 메모리에 올려 두고, 요청마다
+카테고리 매칭/반려동물 적합도/평점을 한 번에 계산해 상위 k개를 고른다.
+카탈로그가 바뀌면 (catalog_version 트리거) 다음 요청에서 다시 적재한다.
+영양제 임베딩 인덱스가 있으면 증상 벡터와의 유사도로 키워드에 없는 제품도 후보에 넣는다.
+"""
+import re
+import threading
+
+import numpy as np
+
+from catalog import catalog_version
+from schema import SUPPLEMENT_COLUMNS
+
+# 점수 가중치 - 카테고리 매칭이 항상 우선하고, 같은 카테고리 안에서 평점/적합도로 정렬
+CATEGORY_WEIGHT = 10.0
+RATING_WEIGHT = 1.0
+SUITABILITY_WEIGHT = 0.5
+SEMANTIC_WEIGHT = 5.0
+
+# 의미 매칭 후보: 유사도 상위 SEMANTIC_TOP_K 개 중 SEMANTIC_THRESHOLD 이상
+SEMANTIC_TOP_K = 5
+SEMANTIC_THRESHOLD = 0.3
+
+SENIOR_AGE = 7       # 노령 기준 (세)
+JUNIOR_AGE = 1       # 성장기 기준 (세)
+LARGE_WEIGHT = 25.0  # 대형견 기준 (kg)
+SMALL_WEIGHT = 10.0  # 소형견 기준 (kg)
+
+# recommended_for 에서 찾는 대상 표현
+SENIOR_TERMS = ("노령",)
+JUNIOR_TERMS = ("성장기", "어린", "퍼피", "키튼")
+LARGE_TERMS = ("대형견",)
+SMALL_TERMS = ("소형견",)
+
+DOSE_UNIT_PATTERN = re.compile(r"체중\s*(\d+(?:\.\d+)?)\s*kg\s*당")
+
+
+def _contains_any(texts, terms):
+    return np.array([any(t in (text or "") for t in terms) for text in texts], dtype=bool)
+
+
+def _dose_unit_kg(dosage):
+    """'체중 10kg당 1정' → 10.0 (체중 기준 용량이 아니면 0)"""
+    match = DOSE_UNIT_PATTERN.search(dosage or "")
+    return float(match.group(1)) if match else 0.0
+
+
+class SupplementRanker:
+    """카탈로그 스냅샷 기반 벡터화 추천 순위"""
+
+    def __init__(self, pool, index=None):
+        self.pool = pool
+        self.index = index
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self.loads = 0
+
+    def _load(self, version):
+        rows = self.pool.query(f"SELECT {', '.join(SUPPLEMENT_COLUMNS)} FROM supplements ORDER BY id")
+        column = {name: i for i, name in enumerate(SUPPLEMENT_COLUMNS)}
+        categories = [row[column["category"]] for row in rows]
+        recommended_for = [row[column["recommended_for"]] for row in rows]
+        category_index = {c: i for i, c in enumerate(dict.fromkeys(categories))}
+
+        vectors = None
+        if self.index is not None:
+            try:
+                vectors = self.index.sync(rows)
+            except Exception as e:
+                # 임베딩 실패시 키워드 카테고리 매칭만 사용
+                print(f"영양제 임베딩 인덱스 사용 불가: {e}")
+
+        self.loads += 1
+        return {
+            "version": version,
+            "rows": rows,
+            "category_index": category_index,
+            "category_code": np.array([category_index[c] for c in categories], dtype=np.int32),
+            "rating": np.array([row[column["rating"]] or 0.0 for row in rows], dtype=np.float32),
+            "dose_unit_kg": np.array([_dose_unit_kg(row[column["dosage"]]) for row in rows], dtype=np.float32),
+            "for_senior": _contains_any(recommended_for, SENIOR_TERMS),
+            "for_junior": _contains_any(recommended_for, JUNIOR_TERMS),
+            "for_large": _contains_any(recommended_for, LARGE_TERMS),
+            "for_small": _contains_any(recommended_for, SMALL_TERMS),
+            "vectors": vectors,
+        }
+
+    def snapshot(self):
+        """현재 카탈로그 스냅샷 (버전이 바뀌었으면 다시 적재)"""
+        version = catalog_version(self.pool)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot["version"] == version:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot["version"] != version:
+                self._snapshot = self._load(version)
+            return self._snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def suitability(self, snapshot, pet_info):
+        """나이/체중 적합도 (-1 ~ 1)"""
+        score = np.zeros(len(snapshot["rows"]), dtype=np.float32)
+        if not pet_info:
+            return score
+
+        age = pet_info.get("age") or 0
+        weight = float(pet_info.get("weight") or 0)
+        # 대상 연령대와 맞으면 가점, 반대 연령대 전용이면 감점
+        if age >= SENIOR_AGE:
+            score += snapshot["for_senior"]
+            score -= snapshot["for_junior"] & ~snapshot["for_senior"]
+        elif age <= JUNIOR_AGE:
+            score += snapshot["for_junior"]
+            score -= snapshot["for_senior"] & ~snapshot["for_junior"]
+
+        if weight >= LARGE_WEIGHT:
+            score += snapshot["for_large"]
+        elif 0 < weight < SMALL_WEIGHT:
+            score += snapshot["for_small"]
+            score -= snapshot["for_large"] & ~snapshot["for_small"]
+
+        # 1회 용량 기준 체중의 절반도 안 되면 나눠 먹이기 어려움
+        unit = snapshot["dose_unit_kg"]
+        score -= (unit > 0) & (weight > 0) & (weight < unit / 2)
+        return np.clip(score, -1, 1)
+
+    def semantic_matches(self, snapshot, query_vector):
+        """증상 벡터와 유사한 제품 마스크와 유사도"""
+        count = len(snapshot["rows"])
+        vectors = snapshot["vectors"]
+        if query_vector is None or vectors is None or not count:
+            return np.zeros(count, dtype=bool), np.zeros(count, dtype=np.float32)
+
+        similarity = self.index.similarity(vectors, query_vector)
+        top = np.argpartition(-similarity, min(SEMANTIC_TOP_K, count) - 1)[:SEMANTIC_TOP_K]
+        mask = np.zeros(count, dtype=bool)
+        mask[top[similarity[top] >= SEMANTIC_THRESHOLD]] = True
+        return mask, similarity
+
+    def rank(self, categories, pet_info=None, k=3, per_category=2, query_vector=None):
+        """매칭 카테고리/증상 벡터 기준 상위 k개 영양제 행 (카테고리당 최대 per_category 개)
+
+        먼저 매칭된 카테고리일수록 우선하고, 의미 매칭만 된 제품은 그 다음이다.
+        """
+        snapshot = self.snapshot()
+        codes = [snapshot["category_index"][c] for c in categories if c in snapshot["category_index"]]
+        semantic_mask, similarity = self.semantic_matches(snapshot, query_vector)
+        if not codes and not semantic_mask.any():
+            return []
+
+        # 카테고리 우선순위 (매칭 순서대로 len..1, 매칭 안 되면 0)
+        priority = np.zeros(len(snapshot["category_index"]), dtype=np.float32)
+        priority[codes] = np.arange(len(codes), 0, -1)
+        category_priority = priority[snapshot["category_code"]]
+
+        score = (
+            CATEGORY_WEIGHT * category_priority
+            + SEMANTIC_WEIGHT * np.clip(similarity, 0, 1)
+            + RATING_WEIGHT * snapshot["rating"]
+            + SUITABILITY_WEIGHT * self.suitability(snapshot, pet_info)
+        )
+        candidates = np.flatnonzero((category_priority > 0) | semantic_mask)
+
+        # 카테고리별 점수순 정렬 후 카테고리 안 순위가 per_category 미만인 것만
+        order = candidates[np.lexsort((-score[candidates], snapshot["category_code"][candidates]))]
+        sorted_codes = snapshot["category_code"][order]
+        group_start = np.r_[0, np.flatnonzero(np.diff(sorted_codes)) + 1]
+        group_rank = np.arange(len(order)) - np.repeat(group_start, np.diff(np.r_[group_start, len(order)]))
+        kept = order[group_rank < per_category]
+
+        # 상위 k개
+        if len(kept) > k:
+            kept = kept[np.argpartition(-score[kept], k - 1)[:k]]
+        top = kept[np.argsort(-score[kept], kind="stable")]
+        return [snapshot["rows"][i] for i in top]
@@ -0,0 +1,89 @@
+"""상담 기록 write-behind 저장: DB 초기화/다중 작성기/저널 재생 후 유실 없음"""
+import json
+import os
+
+import pytest
+
+from consultation_writer import ConsultationWriter
+from db import ConnectionPool
+from schema import migrate, reset_schema
+
+PET = {"name": "초코", "type": "개", "age": 3, "weight": 5.2}
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "test.db"))
+    migrate(pool)
+    return pool
+
+
+def make_writer(pool, journal_dir):
+    return ConsultationWriter(pool, journal_dir=str(journal_dir), flush_interval=60)
+
+
+def stored(pool):
+    return {row[0]: row[1] for row in pool.query("SELECT id, symptoms FROM consultations")}
+
+
+def test_reset_then_second_writer_loses_nothing(pool, tmp_path):
+    first = make_writer(pool, tmp_path / "journal")
+    first.enqueue(PET, "초기화 전", "", "[]")
+    first.flush()
+
+    # reset_database 와 같은 순서: 저장 → 스키마 초기화 → 예약 블록 폐기
+    reset_schema(pool)
+    first.reset_ids()
+
+    second = make_writer(pool, tmp_path / "journal")
+    ids = [second.enqueue(PET, f"두번째-{i}", "", "[]") for i in range(3)]
+    ids += [first.enqueue(PET, f"첫번째-{i}", "", "[]") for i in range(3)]
+    assert len(set(ids)) == len(ids)
+
+    second.flush()
+    first.flush()
+    rows = stored(pool)
+    assert sorted(rows.values()) == sorted([f"두번째-{i}" for i in range(3)] + [f"첫번째-{i}" for i in range(3)])
+    first.close()
+    second.close()
+
+
+def test_stale_block_conflict_is_stored_under_new_id(pool, tmp_path):
+    first = make_writer(pool, tmp_path / "journal")
+    first.enqueue(PET, "초기화 전", "", "[]")
+    first.flush()
+
+    # 다른 프로세스가 초기화해서 이 작성기는 예약 블록을 모르는 경우
+    reset_schema(pool)
+    second = make_writer(pool, tmp_path / "journal")
+    second.enqueue(PET, "다른 프로세스", "", "[]")
+    second.enqueue(PET, "다른 프로세스 2", "", "[]")
+    second.flush()
+
+    first.enqueue(PET, "이전 블록", "", "[]")
+    first.flush()
+    assert sorted(stored(pool).values()) == ["다른 프로세스", "다른 프로세스 2", "이전 블록"]
+    first.close()
+    second.close()
+
+
+def test_replay_leftover_segment(pool, tmp_path):
+    journal_dir = tmp_path / "journal"
+    writer = make_writer(pool, journal_dir)
+    saved_id = writer.enqueue(PET, "저장됨", "", "[]")
+    writer.flush()
+    writer.close()
+
+    # 저장 직후 세그먼트 삭제 전에 중단된 경우 + 저장 전에 중단된 경우
+    saved = (saved_id, "초코", "개", 3, 5.2, "저장됨", "", "[]", "2024-01-01 00:00:00")
+    pending = (saved_id + 1, "초코", "개", 3, 5.2, "미저장", "", "[]", "2024-01-01 00:00:00")
+    with open(os.path.join(journal_dir, "leftover.jsonl"), "w", encoding="utf-8") as f:
+        for row in (saved, pending):
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        f.write('[1, "잘린 줄')
+
+    replayed = make_writer(pool, journal_dir)
+    assert stored(pool) == {saved_id: "저장됨", saved_id + 1: "미저장"}
+    assert not os.path.exists(os.path.join(journal_dir, "leftover.jsonl"))
+    assert replayed.allocate_id() > saved_id + 1
+    replayed.close()
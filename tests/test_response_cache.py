@@ -0,0 +1,50 @@
+"""LLM 응답 디스크 캐시: 누적 합계/LRU 제거/키 정규화"""
+import time
+
+from caching import ResponseCache, response_cache_key
+
+
+def actual_totals(cache):
+    return cache.pool.query_one("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache")
+
+
+def test_running_totals_match_table(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_entries=100)
+    cache.set("a", "하나")
+    cache.set("b", "둘둘")
+    cache.set("a", "하나 바뀜")  # 같은 키 덮어쓰기
+    assert cache.get("a") == "하나 바뀜"
+    stats = cache.stats()
+    assert (stats["size"], stats["bytes"]) == actual_totals(cache)
+    assert stats["size"] == 2
+
+    cache.clear()
+    assert cache.stats()["size"] == 0 and cache.stats()["bytes"] == 0
+
+
+def test_evicts_least_recently_used_to_low_water(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_entries=10, low_water=0.5)
+    for i in range(10):
+        cache.set(f"k{i}", "응답")
+        time.sleep(0.001)
+    cache.get("k0")  # 최근 사용으로 갱신
+    cache.set("k10", "응답")
+
+    stats = cache.stats()
+    assert stats["size"] <= 5
+    assert (stats["size"], stats["bytes"]) == actual_totals(cache)
+    assert cache.get("k0") == "응답"
+    assert cache.get("k1") is None
+
+
+def test_totals_survive_reopen(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResponseCache(path).set("a", "응답")
+    reopened = ResponseCache(path)
+    reopened.set("b", "응답")
+    assert (reopened.stats()["size"], reopened.stats()["bytes"]) == actual_totals(reopened)
+
+
+def test_key_keeps_case_and_ignores_whitespace():
+    assert response_cache_key("m", "Bella 에게 Aspirin") != response_cache_key("m", "bella 에게 aspirin")
+    assert response_cache_key("m", "증상:  기침\n 구토") == response_cache_key("m", "증상: 기침 구토")
@@ -0,0 +1,64 @@
+"""UI 테마 레지스트리
+
+테마 CSS 는 themes/<slug>.css 에 두고 register_theme 으로 등록한다.
+CSS 는 프로세스당 한 번만 압축/해시하고, 페이지에는 압축된 <style> 로 넣는다.
+(Streamlit 정적 파일 서빙은 .css 를 text/plain + nosniff 로 보내 브라우저가 스타일시트로 쓰지 않으므로 사용하지 않음)
+"""
+import functools
+import hashlib
+import os
+import re
+
+THEME_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "themes")
+
+# 이름 → {"slug", "icon", "title", "subtitle"} (등록 순서 = 선택 목록 순서)
+THEMES = {}
+
+
+def register_theme(name, slug, icon, title, subtitle):
+    """테마 등록 (CSS 파일: themes/<slug>.css)"""
+    THEMES[name] = {"slug": slug, "icon": icon, "title": title, "subtitle": subtitle}
+    return THEMES[name]
+
+
+register_theme(
+    "🌿 자연 친화", "nature",
+    icon="🐕🌿",
+    title="AI 펫닥터 - 자연과 함께",
+    subtitle="자연 친화적인 방식으로 반려동물의 건강을 케어합니다",
+)
+register_theme(
+    "🌊 청량 블루", "blue",
+    icon="🐕💙",
+    title="AI 펫닥터 - 프레시 블루",
+    subtitle="깔끔하고 시원한 디자인으로 건강 상담",
+)
+
+DEFAULT_THEME = next(iter(THEMES))
+
+
+def minify_css(css):
+    """주석/불필요한 공백 제거"""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};:,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+@functools.lru_cache(maxsize=None)
+def build_theme(name):
+    """테마 CSS 압축 + 해시 (프로세스당 1회)"""
+    theme = THEMES[name]
+    with open(os.path.join(THEME_DIR, f"{theme['slug']}.css"), encoding="utf-8") as f:
+        css = minify_css(f.read())
+    digest = hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+    return {"css": css, "hash": digest}
+
+
+@functools.lru_cache(maxsize=None)
+def theme_tag(name):
+    """페이지에 넣을 테마 <style> (테마별로 한 번만 생성, 해시는 요소 식별용)"""
+    if name not in THEMES:
+        name = DEFAULT_THEME
+    built = build_theme(name)
+    return f'<style id="theme-{built["hash"]}">{built["css"]}</style>'